@@ -0,0 +1,524 @@
+"""
+batch_sim.py
+
+Vectorized batch simulator for tuning Thunder Fighter, run on the host.
+
+Thousands of games are played at once on NumPy arrays under the same
+integer rules as ThunderFighterGame.update_ms(): the spawn timeline,
+falling, cell rounding for collisions, invincibility and the idle
+timeout. Games are split into chunks over a process pool and the result
+is a survival curve per difficulty: the share of games that cleared at
+least each level, plus how the rest ended.
+
+    python host/batch_sim.py [--games 2000] [--policy dodge|random|still]
+    python host/batch_sim.py --idle-timeout 4 --gain 2.0 --speeds 0.6,1.0,1.5
+    python host/batch_sim.py --levels host/levels.txt --sweep interval=800,1000,1200
+    python host/batch_sim.py --verify 40
+
+With integer positions an enemy's place only depends on how long ago it
+spawned (speed * (level_ms - spawn_ms)), so enemies are never stepped
+one by one: every update is a handful of (games x spawns) array ops.
+--verify replays the first games' inputs through ThunderFighterGame and
+checks that both end the same way on the same step.
+
+Needs numpy (pip install numpy); the game itself does not.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import harness
+
+harness.install()
+
+import compile_levels  # noqa: E402
+import thunder  # noqa: E402
+from difficulty import Difficulty  # noqa: E402
+from levels import LevelPack, DEFAULT_SPEED  # noqa: E402
+from thunder import ThunderFighterGame, SCALE, HALF  # noqa: E402
+
+COLS = 8
+ROWS = 5
+MAX_SECONDS = 600
+
+HIT = 0
+IDLE = 1
+TIMEOUT = 2
+WIN = 3
+CAUSES = ("hit", "idle", "time", "win")
+
+# Spawn time of padding slots, later than any game can run
+NEVER_MS = 1 << 40
+
+SWEEPABLE = ("idle-timeout", "gain", "interval", "reaction-ms", "jitter")
+
+
+class Params:
+    """One tuning point. Plain attributes so it pickles to the workers."""
+
+    def __init__(self, parsed, args):
+        # parsed: [(spawns, speed percent, interval_ms)] per level
+        self.parsed = parsed
+        self.hz = args.hz
+        self.max_seconds = args.max_seconds
+        self.idle_timeout = args.idle_timeout
+        self.invincible_time = args.invincible_time
+        self.gain_x = args.gain if args.gain is not None else thunder.TILT_GAIN_X
+        self.gain_y = args.gain if args.gain is not None else thunder.TILT_GAIN_Y
+        self.speeds = args.speeds
+        self.interval = args.interval
+        self.policy = args.policy
+        self.reaction_ms = args.reaction_ms
+        self.jitter = args.jitter
+        self.invincible_every = args.invincible_every
+        self.max_tilt = args.max_tilt
+        self.label = ""
+
+    def levels(self):
+        if self.interval is None:
+            return self.parsed
+        return [(spawns, speed, self.interval) for spawns, speed, _ in self.parsed]
+
+    def base_speed(self, name: str) -> int:
+        """Sub-units per ms, --speeds or thunder.speed_for_difficulty()."""
+        if self.speeds is None:
+            return thunder.speed_for_difficulty(name)
+        return thunder.speed_fp(self.speeds[Difficulty().options.index(name)])
+
+    def gain_fp(self):
+        return (
+            int(self.gain_x * SCALE / 1000 + 0.5),
+            int(self.gain_y * SCALE / 1000 + 0.5),
+        )
+
+    def describe(self) -> str:
+        return (
+            "idle {}s, gain {}/{}, interval {}, policy {} "
+            "(reaction {} ms, jitter {} mm/s^2)".format(
+                self.idle_timeout,
+                self.gain_x,
+                self.gain_y,
+                "pack" if self.interval is None else "{} ms".format(self.interval),
+                self.policy,
+                self.reaction_ms,
+                self.jitter,
+            )
+        )
+
+
+def read_levels(path: str):
+    """[(spawns, speed percent, interval_ms)] from levels.txt or a compiled pack."""
+    if path.endswith(".txt"):
+        return compile_levels.parse(path)
+    pack = LevelPack(path)
+    parsed = []
+    for level in range(1, pack.count + 1):
+        count = pack.load(level)
+        parsed.append((list(pack.buffer[:count]), pack.speed, pack.interval_ms))
+    pack.close()
+    return parsed
+
+
+def level_tables(levels):
+    """Per-level arrays, row 0 unused so the 1-based level indexes them."""
+    count = len(levels)
+    width = max(len(spawns) for spawns, _, _ in levels)
+    lanes = np.full((count + 1, width), -1, np.int64)
+    times = np.full((count + 1, width), NEVER_MS, np.int64)
+    lengths = np.zeros(count + 1, np.int64)
+    speed_pct = np.full(count + 1, DEFAULT_SPEED, np.int64)
+    for level, (spawns, speed, interval) in enumerate(levels, 1):
+        n = len(spawns)
+        lanes[level, :n] = spawns
+        # Spawn k is due (k + 1) intervals into the level
+        times[level, :n] = np.arange(1, n + 1) * interval
+        lengths[level] = n
+        speed_pct[level] = speed
+    last = times[np.arange(count + 1), np.maximum(lengths - 1, 0)]
+    return lanes, times, lengths, speed_pct, last
+
+
+def simulate(params, name: str, games: int, seed: int, record: bool = False) -> dict:
+    rng = np.random.default_rng(seed)
+    lanes_t, times_t, lengths, speed_pct, last_t = level_tables(params.levels())
+    max_level = len(lengths) - 1
+    hz = params.hz
+    max_steps = params.max_seconds * hz
+    bottom = ROWS * SCALE
+    gain_x, gain_y = params.gain_fp()
+    idle_ms_limit = int(params.idle_timeout * 1000)
+    invincible_ms = int(params.invincible_time * 1000)
+    press_every = int(params.invincible_every * hz)
+    react_steps = max(1, params.reaction_ms * hz // 1000)
+    cols = np.arange(COLS)
+
+    base = params.base_speed(name)
+    ids = np.arange(games)
+    level = np.ones(games, np.int64)
+    level_ms = np.zeros(games, np.int64)
+    speed = np.full(games, base * speed_pct[1] // 100, np.int64)
+    px = np.full(games, COLS // 2, np.int64)
+    py = np.full(games, ROWS - 1, np.int64)
+    last_x = px.copy()
+    last_y = py.copy()
+    idle = np.zeros(games, np.int64)
+    inv = np.zeros(games, bool)
+    inv_ms = np.zeros(games, np.int64)
+
+    # Policy state
+    target = np.full(games, COLS // 2, np.int64)
+    on_target = np.zeros(games, np.int64)
+    phase = rng.integers(0, react_steps, games)
+    tilt_x = np.zeros(games, np.int64)
+    tilt_y = np.zeros(games, np.int64)
+    occupied = np.zeros((games, COLS), bool)
+
+    cleared = np.zeros(games, np.int64)
+    cause = np.full(games, TIMEOUT, np.int64)
+    end_step = np.full(games, max_steps - 1, np.int64)
+    if record:
+        rec_dx = np.zeros((max_steps, games), np.int64)
+        rec_dy = np.zeros((max_steps, games), np.int64)
+        rec_press = np.zeros((max_steps, games), bool)
+
+    for step in range(max_steps):
+        if not len(ids):
+            break
+        k = step % hz
+        dt = (k + 1) * 1000 // hz - k * 1000 // hz
+        n = len(ids)
+        rows_n = np.arange(n)
+
+        # Player policy, from what the last update left on the screen
+        decide = (step + phase) % react_steps == 0
+        if params.policy == "dodge":
+            # host/bench.py's DodgeBot: bottom row, slide to a free column
+            on_target += 1
+            free = ~occupied
+            need = decide & ((on_target > 2 * hz) | ~free[rows_n, target])
+            if need.any():
+                dist = np.abs(cols - target[:, None])
+                key = dist * 2 + (cols > target[:, None])
+                key[~free | (dist == 0)] = 4 * COLS
+                best = key.argmin(1)
+                move = need & (key[rows_n, best] < 4 * COLS)
+                target[move] = best[move]
+                on_target[move] = 0
+            dx = np.rint((2 * target - (COLS - 1)) * 500 / params.gain_x).astype(np.int64)
+            dy = np.full(n, int(np.rint(-(ROWS - 1) * 500 / params.gain_y)), np.int64)
+        elif params.policy == "random":
+            new_x = rng.integers(-params.max_tilt, params.max_tilt + 1, n)
+            new_y = rng.integers(-params.max_tilt, params.max_tilt + 1, n)
+            tilt_x = np.where(decide, new_x, tilt_x)
+            tilt_y = np.where(decide, new_y, tilt_y)
+            dx = tilt_x
+            dy = tilt_y
+        else:
+            dx = np.zeros(n, np.int64)
+            dy = np.zeros(n, np.int64)
+        if params.jitter:
+            dx = dx + np.rint(rng.normal(0, params.jitter, n)).astype(np.int64)
+            dy = dy + np.rint(rng.normal(0, params.jitter, n)).astype(np.int64)
+        press = np.full(n, press_every > 0 and step % press_every == 0)
+        if record:
+            rec_dx[step, ids] = dx
+            rec_dy[step, ids] = dy
+            rec_press[step, ids] = press
+
+        # handle_input_fp()
+        pos = np.clip((COLS - 1) * HALF + dx * gain_x, 0, (COLS - 1) * SCALE)
+        px = (pos + HALF) // SCALE
+        pos = np.clip((ROWS - 1) * HALF - dy * gain_y, 0, (ROWS - 1) * SCALE)
+        py = (pos + HALF) // SCALE
+        pressed = press & ~inv
+        inv = inv | pressed
+        inv_ms = np.where(pressed, invincible_ms, inv_ms)
+
+        # update_ms()
+        inv_ms = np.where(inv, inv_ms - dt, inv_ms)
+        inv = inv & (inv_ms > 0)
+
+        times = times_t[level]
+        spawned = (times <= level_ms[:, None]).sum(1)
+        level_ms = level_ms + dt
+        spawning = (times <= level_ms[:, None]).sum(1) > spawned
+        # The last spawn is the highest enemy, once it is off the screen all are
+        advance = (
+            ~spawning
+            & (spawned >= lengths[level])
+            & (speed * (level_ms - last_t[level]) >= bottom)
+        )
+        won = advance & (level >= max_level)
+        advance &= ~won
+        if advance.any():
+            level = level + advance
+            level_ms = np.where(advance, 0, level_ms)
+            speed = np.where(advance, base * speed_pct[level] // 100, speed)
+
+        moved = (px != last_x) | (py != last_y)
+        idle = np.where(moved, 0, idle + dt)
+        last_x = px
+        last_y = py
+        idled = ~won & (idle >= idle_ms_limit)
+
+        age = level_ms[:, None] - times_t[level]
+        y = speed[:, None] * age
+        live = (age >= 0) & (y < bottom)
+        row = (y + HALF) // SCALE
+        lanes = lanes_t[level]
+        hit = ~won & ~idled & ~inv & np.any(live & (lanes == px[:, None]) & (row == py[:, None]), 1)
+
+        if params.policy == "dodge":
+            low = live & (row >= ROWS - 2) & (row < ROWS)
+            occupied = np.zeros((n, COLS + 1), bool)
+            occupied[rows_n[:, None], np.where(low, lanes, COLS)] = True
+            occupied = occupied[:, :COLS]
+
+        done = won | idled | hit
+        if done.any():
+            gone = ids[done]
+            cleared[gone] = np.where(won[done], max_level, level[done] - 1)
+            cause[gone] = np.where(won[done], WIN, np.where(idled[done], IDLE, HIT))
+            end_step[gone] = step
+
+            keep = ~done
+            ids = ids[keep]
+            level, level_ms, speed = level[keep], level_ms[keep], speed[keep]
+            last_x, last_y, idle = last_x[keep], last_y[keep], idle[keep]
+            inv, inv_ms = inv[keep], inv_ms[keep]
+            target, on_target, phase = target[keep], on_target[keep], phase[keep]
+            tilt_x, tilt_y, occupied = tilt_x[keep], tilt_y[keep], occupied[keep]
+
+    # Still running at the time limit
+    cleared[ids] = level - 1
+
+    result = {
+        "difficulty": name,
+        "games": games,
+        "cleared": np.bincount(cleared, minlength=max_level + 1),
+        "causes": np.bincount(cause, minlength=len(CAUSES)),
+        "seconds": (end_step + 1).sum() / hz,
+    }
+    if record:
+        result["per_game"] = (cleared, cause, end_step)
+        result["inputs"] = (rec_dx, rec_dy, rec_press)
+    return result
+
+
+def simulate_chunk(job):
+    index, params, name, games, seed = job
+    return index, simulate(params, name, games, seed)
+
+
+def survival(counts: dict, max_level: int):
+    """Share of games that cleared at least level L, for L = 1..max_level."""
+    cleared = counts["cleared"]
+    games = counts["games"]
+    return [float(cleared[level:].sum()) / games for level in range(1, max_level + 1)]
+
+
+def run_batch(variants, names, games: int, chunk: int, workers: int, seed: int):
+    """Results per (variant, difficulty) with chunk outputs summed."""
+    jobs = []
+    seeds = np.random.SeedSequence(seed)
+    for v, params in enumerate(variants):
+        for name in names:
+            left = games
+            while left > 0:
+                size = min(chunk, left)
+                child = int(seeds.spawn(1)[0].generate_state(1)[0])
+                jobs.append(((v, name), params, name, size, child))
+                left -= size
+
+    totals = {}
+
+    def add(index, result):
+        total = totals.get(index)
+        if total is None:
+            totals[index] = result
+            return
+        total["games"] += result["games"]
+        total["cleared"] = total["cleared"] + result["cleared"]
+        total["causes"] = total["causes"] + result["causes"]
+        total["seconds"] += result["seconds"]
+
+    if workers <= 1:
+        for job in jobs:
+            add(*simulate_chunk(job))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for index, result in pool.map(simulate_chunk, jobs):
+                add(index, result)
+    return totals
+
+
+def write_pack(levels) -> str:
+    """Compile levels to a temporary pack for ThunderFighterGame."""
+    fd, path = tempfile.mkstemp(suffix=".bin")
+    with os.fdopen(fd, "wb") as f:
+        f.write(compile_levels.compile_pack(levels))
+    return path
+
+
+def verify(params, name: str, games: int, seed: int) -> int:
+    """Replay simulated inputs through ThunderFighterGame. Returns mismatches."""
+    sim = simulate(params, name, games, seed, record=True)
+    cleared, cause, end_step = sim["per_game"]
+    rec_dx, rec_dy, rec_press = sim["inputs"]
+
+    saved = (thunder.TILT_GAIN_X_FP, thunder.TILT_GAIN_Y_FP, thunder.IDLE_TIMEOUT_MS, thunder.INVINCIBLE_MS)
+    thunder.TILT_GAIN_X_FP, thunder.TILT_GAIN_Y_FP = params.gain_fp()
+    thunder.IDLE_TIMEOUT_MS = int(params.idle_timeout * 1000)
+    thunder.INVINCIBLE_MS = int(params.invincible_time * 1000)
+
+    pack_path = write_pack(params.levels())
+    mismatches = 0
+    try:
+        _, display = harness.make_display()
+        game = ThunderFighterGame(display, name, levels=LevelPack(pack_path))
+        hz = params.hz
+        for g in range(games):
+            game.base_speed = params.base_speed(name)
+            game.reset()
+            status = "running"
+            step = 0
+            for step in range(params.max_seconds * hz):
+                k = step % hz
+                game.handle_input_fp(int(rec_dx[step, g]), int(rec_dy[step, g]), bool(rec_press[step, g]))
+                status = game.update_ms((k + 1) * 1000 // hz - k * 1000 // hz)
+                if status != "running":
+                    break
+
+            if status == "win":
+                got = WIN
+            elif status == "game_over":
+                got = IDLE if game.idle_ms >= thunder.IDLE_TIMEOUT_MS else HIT
+            else:
+                got = TIMEOUT
+            score = game.score if status != "running" else game.current_level - 1
+            if (got, score, step) != (cause[g], cleared[g], end_step[g]):
+                mismatches += 1
+                print(
+                    "  {} game {}: game {} L{} step {}, sim {} L{} step {}".format(
+                        name, g, CAUSES[got], score, step,
+                        CAUSES[cause[g]], cleared[g], end_step[g],
+                    )
+                )
+        game.levels.close()
+    finally:
+        os.remove(pack_path)
+        thunder.TILT_GAIN_X_FP, thunder.TILT_GAIN_Y_FP, thunder.IDLE_TIMEOUT_MS, thunder.INVINCIBLE_MS = saved
+    return mismatches
+
+
+def _variants(args, parsed):
+    if not args.sweep:
+        return [Params(parsed, args)]
+    key, _, values = args.sweep.partition("=")
+    if key not in SWEEPABLE or not values:
+        raise SystemExit("--sweep takes NAME=v1,v2,... with NAME one of " + ", ".join(SWEEPABLE))
+    variants = []
+    for value in values.split(","):
+        number = float(value)
+        setattr(args, key.replace("-", "_"), int(number) if number.is_integer() and key != "gain" else number)
+        params = Params(parsed, args)
+        params.label = "{}={}".format(key, value)
+        variants.append(params)
+    return variants
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--games", type=int, default=2000, help="games per difficulty (default 2000)")
+    parser.add_argument("--levels", default=os.path.join(harness.SRC_DIR, "levels.bin"),
+                        help="levels.txt source or compiled pack (default src/levels.bin)")
+    parser.add_argument("--policy", choices=("dodge", "random", "still"), default="dodge")
+    parser.add_argument("--reaction-ms", type=int, default=0,
+                        help="policy looks at the screen only this often (0: every step)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="tilt noise, std dev in mm/s^2")
+    parser.add_argument("--max-tilt", type=int, default=3000, help="random policy tilt range in mm/s^2")
+    parser.add_argument("--invincible-every", type=float, default=5.0,
+                        help="press invincibility every N seconds (0: never)")
+    parser.add_argument("--idle-timeout", type=float, default=thunder.IDLE_TIMEOUT)
+    parser.add_argument("--invincible-time", type=float, default=thunder.INVINCIBLE_TIME)
+    parser.add_argument("--gain", type=float, help="TILT_GAIN_X and TILT_GAIN_Y")
+    parser.add_argument("--speeds", help="rows/s for EASY,MEDIUM,HARD")
+    parser.add_argument("--interval", type=int, help="ms between spawns on every level")
+    parser.add_argument("--sweep", help="NAME=v1,v2,... over " + ", ".join(SWEEPABLE))
+    parser.add_argument("--hz", type=int, default=60, help="simulation rate (default 60)")
+    parser.add_argument("--max-seconds", type=int, default=MAX_SECONDS)
+    parser.add_argument("--chunk", type=int, default=500, help="games per worker job")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--verify", type=int, default=0, metavar="N",
+                        help="check the first N games per difficulty against ThunderFighterGame")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    if args.speeds:
+        args.speeds = [float(v) for v in args.speeds.split(",")]
+        if len(args.speeds) != len(Difficulty().options):
+            parser.error("--speeds takes one value per difficulty")
+
+    try:
+        parsed = read_levels(args.levels)
+    except (OSError, ValueError) as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+    variants = _variants(args, parsed)
+    names = Difficulty().options
+    max_level = len(parsed)
+
+    if args.verify:
+        bad = 0
+        for params in variants:
+            for name in names:
+                bad += verify(params, name, args.verify, args.seed)
+        print("verify: {} of {} games differ from ThunderFighterGame".format(
+            bad, args.verify * len(names) * len(variants)))
+        if bad:
+            sys.exit(1)
+
+    start = time.perf_counter()
+    totals = run_batch(variants, names, args.games, args.chunk, args.workers, args.seed)
+    elapsed = time.perf_counter() - start
+
+    print("{} games per difficulty x {} setting(s), {} workers, {:.1f} s".format(
+        args.games, len(variants), args.workers, elapsed))
+    results = []
+    for v, params in enumerate(variants):
+        print()
+        print((params.label + ": " if params.label else "") + params.describe())
+        print("{:<7} ".format("diff") + " ".join("{:>5}".format("L" + str(level)) for level in range(1, max_level + 1))
+              + "  " + " ".join("{:>5}".format(c) for c in CAUSES) + " {:>7}".format("avg s"))
+        for name in names:
+            counts = totals[(v, name)]
+            curve = survival(counts, max_level)
+            causes = counts["causes"] / counts["games"]
+            mean_s = counts["seconds"] / counts["games"]
+            print("{:<7} ".format(name) + " ".join("{:>5.1f}".format(100 * p) for p in curve)
+                  + "  " + " ".join("{:>5.1f}".format(100 * c) for c in causes) + " {:>7.1f}".format(mean_s))
+            results.append({
+                "setting": params.label,
+                "params": params.describe(),
+                "difficulty": name,
+                "games": counts["games"],
+                "survival": curve,
+                "causes": dict(zip(CAUSES, causes.tolist())),
+                "mean_seconds": mean_s,
+            })
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""
+bench.py
+
+Frame-time benchmark for ThunderFighterGame, run on the host.
+
+A bot plays every level on each difficulty. For every frame the suite
+records update() and draw() time, displayio objects constructed,
+Python heap bytes allocated and SSD1306 bytes a RefreshController
+would send, plus the peak heap of the whole run.
+
+    python host/bench.py [--hz 60] [--json results.json]
+
+Timing and allocation are measured in separate passes, tracemalloc
+slows everything down too much to time with it switched on.
+"""
+
+import argparse
+import json
+import time
+import tracemalloc
+from array import array
+
+import harness
+
+harness.install()
+
+import displayio  # noqa: E402
+from difficulty import Difficulty  # noqa: E402
+from refresh import RefreshController  # noqa: E402
+import thunder  # noqa: E402
+from thunder import ThunderFighterGame  # noqa: E402
+
+MAX_SECONDS = 600
+
+
+class DodgeBot:
+    """Stays on the bottom row and slides to a free column, never idling."""
+
+    def __init__(self, game, hz: int):
+        self.game = game
+        self.hz = hz
+        self.target = game.cols // 2
+        self.frames_on_target = 0
+
+    def _free(self, col: int) -> bool:
+        g = self.game
+        bit = 1 << col
+        return not (g.row_mask[g.rows - 1] & bit or g.row_mask[g.rows - 2] & bit)
+
+    def inputs(self, frame: int):
+        g = self.game
+        self.frames_on_target += 1
+        restless = self.frames_on_target > 2 * self.hz
+        if restless or not self._free(self.target):
+            for step in range(1, g.cols):
+                for col in (self.target - step, self.target + step):
+                    if 0 <= col < g.cols and self._free(col):
+                        self.target = col
+                        self.frames_on_target = 0
+                        break
+                else:
+                    continue
+                break
+
+        # Tilt in mm/s^2, the units the integer engine takes
+        dx = round((self.target - (g.cols - 1) / 2.0) * 1000 / thunder.TILT_GAIN_X)
+        dy = round(((g.rows - 1) / 2.0 - (g.rows - 1)) * 1000 / thunder.TILT_GAIN_Y)
+        invincible = frame % (5 * self.hz) == 0
+        return dx, dy, invincible
+
+
+def _play(name: str, hz: int, measure, display=None, damage=None):
+    if display is None:
+        _, display = harness.make_display()
+    game = ThunderFighterGame(display, name, damage=damage)
+    game.reset(name)
+    bot = DodgeBot(game, hz)
+
+    status = "running"
+    frame = 0
+    while status == "running" and frame < MAX_SECONDS * hz:
+        dx, dy, inv = bot.inputs(frame)
+        game.handle_input_fp(dx, dy, inv)
+        # Whole ms per frame that add up to exactly one second per hz frames
+        k = frame % hz
+        status = measure(game, (k + 1) * 1000 // hz - k * 1000 // hz)
+        frame += 1
+    return game, status, frame
+
+
+def _percentile(values, pct: float):
+    if not values:
+        return 0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def run_difficulty(name: str, hz: int) -> dict:
+    update_ns = []
+    draw_ns = []
+
+    def timed(game, dt_ms):
+        t0 = time.perf_counter_ns()
+        status = game.update_ms(dt_ms)
+        t1 = time.perf_counter_ns()
+        game.draw()
+        t2 = time.perf_counter_ns()
+        update_ns.append(t1 - t0)
+        draw_ns.append(t2 - t1)
+        return status
+
+    game, status, frames = _play(name, hz, timed)
+
+    bus_bytes = []
+
+    def flushed(game, dt_ms):
+        status = game.update_ms(dt_ms)
+        game.draw()
+        refresher.flush(force=True)
+        bus_bytes.append(refresher.bytes_last if refresher.flushes > 1 else 0)
+        return status
+
+    _, display = harness.make_display()
+    refresher = RefreshController(display)
+    _play(name, hz, flushed, display=display, damage=refresher)
+
+    # Preallocated so the bookkeeping itself does not show up as heap use
+    objects = array("l", [0]) * frames
+    alloc = array("l", [0]) * frames
+    run_peak = array("l", [0])
+    cursor = array("l", [0])
+
+    def counted(game, dt_ms):
+        i = cursor[0]
+        before_objects = displayio.objects_created()
+        before_heap = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        status = game.update_ms(dt_ms)
+        game.draw()
+        peak = tracemalloc.get_traced_memory()[1]
+        if i < frames:
+            objects[i] = displayio.objects_created() - before_objects
+            alloc[i] = peak - before_heap
+            cursor[0] = i + 1
+        if peak > run_peak[0]:
+            run_peak[0] = peak
+        return status
+
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    try:
+        _play(name, hz, counted)
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "difficulty": name,
+        "status": status,
+        "level": game.current_level,
+        "score": game.score,
+        "frames": frames,
+        "update_us": {
+            "mean": sum(update_ns) / len(update_ns) / 1000,
+            "p95": _percentile(update_ns, 0.95) / 1000,
+            "max": max(update_ns) / 1000,
+        },
+        "draw_us": {
+            "mean": sum(draw_ns) / len(draw_ns) / 1000,
+            "p95": _percentile(draw_ns, 0.95) / 1000,
+            "max": max(draw_ns) / 1000,
+        },
+        "objects_per_frame": sum(objects) / len(objects),
+        "objects_max": max(objects),
+        "alloc_bytes_per_frame": sum(alloc) / len(alloc),
+        "alloc_bytes_max": max(alloc),
+        "peak_kib": (run_peak[0] - baseline) / 1024,
+        "bus_bytes_per_frame": sum(bus_bytes) / len(bus_bytes),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--hz", type=int, default=60, help="simulation rate (default 60)")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    results = [run_difficulty(name, args.hz) for name in Difficulty().options]
+
+    print(
+        "{:<7} {:>9} {:>6} {:>7} {:>16} {:>16} {:>8} {:>10} {:>8} {:>13}".format(
+            "diff", "result", "level", "frames", "update us avg/p95/max",
+            "draw us avg/p95/max", "obj/frm", "alloc B/frm", "peak KiB", "est bus B/frm",
+        )
+    )
+    for r in results:
+        print(
+            "{:<7} {:>9} {:>6} {:>7} {:>5.1f}/{:>5.1f}/{:>6.1f} {:>5.1f}/{:>5.1f}/{:>6.1f} {:>8.2f} {:>11.1f} {:>8.1f} {:>13.1f}".format(
+                r["difficulty"], r["status"], r["level"], r["frames"],
+                r["update_us"]["mean"], r["update_us"]["p95"], r["update_us"]["max"],
+                r["draw_us"]["mean"], r["draw_us"]["p95"], r["draw_us"]["max"],
+                r["objects_per_frame"], r["alloc_bytes_per_frame"], r["peak_kib"],
+                r["bus_bytes_per_frame"],
+            )
+        )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
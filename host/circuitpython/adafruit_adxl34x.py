@@ -0,0 +1,174 @@
+"""
+adafruit_adxl34x.py (host stand-in)
+
+Register-level ADXL345 driver matching the Adafruit library, plus
+FakeADXL345, a scriptable sensor that sits on the fake busio.I2C bus.
+Constructing ADXL345 on a bus without a device at its address attaches
+a FakeADXL345 automatically.
+
+FakeADXL345 also models the 32-entry FIFO in stream mode: samples are
+queued at the configured output data rate from time.monotonic(), each
+with the time it was taken, and a full FIFO drops its oldest entry.
+Give it a signal (a function of that time) to see how old the data a
+reader gets is.
+"""
+
+import time
+from struct import pack, unpack
+
+from adafruit_bus_device import i2c_device
+
+_ADXL345_DEFAULT_ADDRESS = 0x53
+_ADXL345_MG2G_MULTIPLIER = 0.004
+_STANDARD_GRAVITY = 9.80665
+
+_REG_DEVID = 0x00
+_REG_BW_RATE = 0x2C
+_REG_POWER_CTL = 0x2D
+_REG_INT_ENABLE = 0x2E
+_REG_INT_SOURCE = 0x30
+_REG_DATA_FORMAT = 0x31
+_REG_DATAX0 = 0x32
+_REG_FIFO_CTL = 0x38
+_REG_FIFO_STATUS = 0x39
+
+_FIFO_DEPTH = 32
+
+
+class DataRate:
+    RATE_3200_HZ = 0b1111
+    RATE_1600_HZ = 0b1110
+    RATE_800_HZ = 0b1101
+    RATE_400_HZ = 0b1100
+    RATE_200_HZ = 0b1011
+    RATE_100_HZ = 0b1010
+    RATE_50_HZ = 0b1001
+    RATE_25_HZ = 0b1000
+    RATE_12_5_HZ = 0b0111
+    RATE_6_25HZ = 0b0110
+    RATE_3_13_HZ = 0b0101
+    RATE_1_56_HZ = 0b0100
+    RATE_0_78_HZ = 0b0011
+    RATE_0_39_HZ = 0b0010
+    RATE_0_20_HZ = 0b0001
+    RATE_0_10_HZ = 0b0000
+
+
+class FakeADXL345:
+    """
+    Scriptable ADXL345 register model.
+
+    source: callable returning (x, y, z) in m/s^2 for the next sample;
+            defaults to a device lying flat.
+    signal: callable taking a time.monotonic() value and returning
+            (x, y, z) at that time. When set it replaces source, and
+            FIFO entries hold the value at the moment they were sampled
+            rather than when the bus caught up with them.
+    """
+
+    def __init__(self, source=None, signal=None):
+        self.source = source or (lambda: (0.0, 0.0, _STANDARD_GRAVITY))
+        self.signal = signal
+        self.registers = bytearray(64)
+        self.registers[_REG_DEVID] = 0xE5
+        self.registers[_REG_BW_RATE] = DataRate.RATE_100_HZ
+        self._pointer = 0
+        self._fifo = []
+        self._last_fill = time.monotonic()
+        self.samples_read = 0
+        # When the sample last read from the data registers was taken
+        self.last_sample_time = None
+
+    @property
+    def data_rate_hz(self) -> float:
+        return 3200.0 / (1 << (15 - (self.registers[_REG_BW_RATE] & 0x0F)))
+
+    @property
+    def streaming(self) -> bool:
+        return self.registers[_REG_FIFO_CTL] & 0xC0 == 0x80
+
+    def _sample_bytes(self, t):
+        value = self.signal(t) if self.signal is not None else self.source()
+        scale = _ADXL345_MG2G_MULTIPLIER * _STANDARD_GRAVITY
+        counts = [max(-32768, min(32767, int(round(v / scale)))) for v in value]
+        return pack("<hhh", *counts)
+
+    def _fill_fifo(self):
+        now = time.monotonic()
+        rate = self.data_rate_hz
+        due = int((now - self._last_fill) * rate)
+        if due <= 0:
+            return
+        # Only the newest _FIFO_DEPTH samples can still be queued
+        for i in range(max(0, due - _FIFO_DEPTH), due):
+            t = self._last_fill + (i + 1) / rate
+            self._fifo.append((t, self._sample_bytes(t)))
+        self._last_fill += due / rate
+        del self._fifo[:-_FIFO_DEPTH]
+
+    def write(self, data):
+        self._pointer = data[0]
+        for value in data[1:]:
+            self.registers[self._pointer] = value
+            if self._pointer == _REG_FIFO_CTL and not self.streaming:
+                self._fifo = []
+                self._last_fill = time.monotonic()
+            self._pointer += 1
+
+    def read(self, n):
+        if self.streaming:
+            self._fill_fifo()
+            self.registers[_REG_FIFO_STATUS] = len(self._fifo)
+        if self._pointer == _REG_DATAX0:
+            if self.streaming and self._fifo:
+                self.last_sample_time, data = self._fifo.pop(0)
+            else:
+                self.last_sample_time = time.monotonic()
+                data = self._sample_bytes(self.last_sample_time)
+            self.samples_read += 1
+            self.registers[_REG_DATAX0 : _REG_DATAX0 + 6] = data
+        out = bytes(self.registers[self._pointer : self._pointer + n])
+        self._pointer += n
+        return out
+
+
+class ADXL345:
+    def __init__(self, i2c, address=_ADXL345_DEFAULT_ADDRESS):
+        if address not in i2c.devices:
+            i2c.attach(address, FakeADXL345())
+        self._i2c = i2c_device.I2CDevice(i2c, address)
+        self._buffer = bytearray(6)
+        self._write_register_byte(_REG_POWER_CTL, 0x08)
+        self._write_register_byte(_REG_INT_ENABLE, 0x0)
+
+    @property
+    def acceleration(self):
+        x, y, z = unpack("<hhh", self._read_register(_REG_DATAX0, 6))
+        x = x * _ADXL345_MG2G_MULTIPLIER * _STANDARD_GRAVITY
+        y = y * _ADXL345_MG2G_MULTIPLIER * _STANDARD_GRAVITY
+        z = z * _ADXL345_MG2G_MULTIPLIER * _STANDARD_GRAVITY
+        return x, y, z
+
+    @property
+    def data_rate(self):
+        return self._read_register_unpacked(_REG_BW_RATE) & 0x0F
+
+    @data_rate.setter
+    def data_rate(self, val):
+        self._write_register_byte(_REG_BW_RATE, val)
+
+    def _read_register_unpacked(self, register):
+        return unpack("<b", self._read_register(register, 1))[0]
+
+    def _read_register(self, register, length):
+        self._buffer[0] = register & 0xFF
+        with self._i2c as i2c:
+            i2c.write(self._buffer, start=0, end=1)
+            i2c.readinto(self._buffer, start=0, end=length)
+            return self._buffer[0:length]
+
+    def _write_register_byte(self, register, value):
+        self._buffer[0] = register & 0xFF
+        self._buffer[1] = value & 0xFF
+        with self._i2c as i2c:
+            i2c.write(self._buffer, start=0, end=2)
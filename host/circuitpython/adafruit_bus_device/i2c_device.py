@@ -0,0 +1,39 @@
+"""
+adafruit_bus_device.i2c_device (host stand-in)
+"""
+
+
+class I2CDevice:
+    def __init__(self, i2c, device_address, probe=True):
+        self.i2c = i2c
+        self.device_address = device_address
+        if probe and device_address not in i2c.devices:
+            raise ValueError("No I2C device at address: 0x%x" % device_address)
+
+    def readinto(self, buf, *, start=0, end=None):
+        self.i2c.readfrom_into(self.device_address, buf, start=start, end=end)
+
+    def write(self, buf, *, start=0, end=None):
+        self.i2c.writeto(self.device_address, buf, start=start, end=end)
+
+    def write_then_readinto(
+        self, out_buffer, in_buffer, *, out_start=0, out_end=None, in_start=0, in_end=None
+    ):
+        self.i2c.writeto_then_readfrom(
+            self.device_address,
+            out_buffer,
+            in_buffer,
+            out_start=out_start,
+            out_end=out_end,
+            in_start=in_start,
+            in_end=in_end,
+        )
+
+    def __enter__(self):
+        while not self.i2c.try_lock():
+            pass
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.i2c.unlock()
+        return False
@@ -0,0 +1,41 @@
+"""
+adafruit_debouncer.py (host stand-in)
+"""
+
+import time
+
+
+class Debouncer:
+    def __init__(self, io_or_predicate, interval=0.010):
+        if hasattr(io_or_predicate, "value"):
+            self._read = lambda: io_or_predicate.value
+        else:
+            self._read = io_or_predicate
+        self.interval = interval
+        self._unstable = bool(self._read())
+        self._stable = self._unstable
+        self._changed = False
+        self._last = time.monotonic()
+
+    def update(self, new_state=None):
+        self._changed = False
+        current = bool(self._read()) if new_state is None else bool(new_state)
+        now = time.monotonic()
+        if current != self._unstable:
+            self._unstable = current
+            self._last = now
+        elif now - self._last >= self.interval and current != self._stable:
+            self._stable = current
+            self._changed = True
+
+    @property
+    def value(self):
+        return self._stable
+
+    @property
+    def rose(self):
+        return self._stable and self._changed
+
+    @property
+    def fell(self):
+        return (not self._stable) and self._changed
@@ -0,0 +1,26 @@
+"""
+adafruit_display_text.label (host stand-in)
+
+A Label is a Group holding its text; text changes are counted.
+"""
+
+import displayio
+
+
+class Label(displayio.Group):
+    def __init__(self, font, *, text="", color=0xFFFFFF, x=0, y=0, scale=1, **kwargs):
+        super().__init__(scale=scale, x=x, y=y)
+        displayio.created["Label"] = displayio.created.get("Label", 0) + 1
+        self.font = font
+        self.color = color
+        self._text = text
+        self.text_updates = 0
+
+    @property
+    def text(self):
+        return self._text
+
+    @text.setter
+    def text(self, value):
+        self.text_updates += 1
+        self._text = value
@@ -0,0 +1,33 @@
+"""
+adafruit_displayio_ssd1306.py (host stand-in)
+
+Recording display: keeps every root_group assignment and refresh call.
+"""
+
+
+class SSD1306:
+    def __init__(self, bus, *, width=128, height=64, auto_refresh=True, **kwargs):
+        self.bus = bus
+        self.width = width
+        self.height = height
+        self.auto_refresh = auto_refresh
+        self._root_group = None
+        self.root_group_sets = 0
+        self.refreshes = 0
+        self.history = []
+        self.record_history = False
+
+    @property
+    def root_group(self):
+        return self._root_group
+
+    @root_group.setter
+    def root_group(self, group):
+        self.root_group_sets += 1
+        if self.record_history:
+            self.history.append(group)
+        self._root_group = group
+
+    def refresh(self, *, target_frames_per_second=None, minimum_frames_per_second=0):
+        self.refreshes += 1
+        return True
@@ -0,0 +1,31 @@
+"""
+adafruit_ticks.py (host stand-in)
+
+Same wrap-around millisecond arithmetic as the real library.
+"""
+
+import time
+
+_TICKS_PERIOD = 1 << 29
+_TICKS_MAX = _TICKS_PERIOD - 1
+_TICKS_HALFPERIOD = _TICKS_PERIOD // 2
+
+
+def ticks_ms() -> int:
+    return int(time.monotonic() * 1000) & _TICKS_MAX
+
+
+def ticks_add(ticks: int, delta: int) -> int:
+    if -_TICKS_HALFPERIOD < delta < _TICKS_HALFPERIOD:
+        return (ticks + delta) % _TICKS_PERIOD
+    raise OverflowError("ticks interval overflow")
+
+
+def ticks_diff(ticks1: int, ticks2: int) -> int:
+    diff = (ticks1 - ticks2) & _TICKS_MAX
+    diff = ((diff + _TICKS_HALFPERIOD) & _TICKS_MAX) - _TICKS_HALFPERIOD
+    return diff
+
+
+def ticks_less(ticks1: int, ticks2: int) -> bool:
+    return ticks_diff(ticks1, ticks2) < 0
@@ -0,0 +1,32 @@
+"""
+alarm (host stand-in)
+
+light_sleep_until_alarms() waits on the virtual clock until a TimeAlarm
+is due or a PinAlarm's pin sits at its level, then returns that alarm.
+It sleeps in 1 ms steps through time.sleep(), so scripts that replace
+time.sleep / time.monotonic drive it like the rest of the loop.
+"""
+
+import time as _time
+
+from alarm import pin, time  # noqa: F401
+
+sleeps = 0
+wake_alarm = None
+
+
+def light_sleep_until_alarms(*alarms):
+    global sleeps, wake_alarm
+    if not alarms:
+        raise ValueError("no alarms")
+    sleeps += 1
+    while True:
+        for a in alarms:
+            if isinstance(a, pin.PinAlarm):
+                if a.pin.level == a.value:
+                    wake_alarm = a
+                    return a
+            elif _time.monotonic() >= a.monotonic_time:
+                wake_alarm = a
+                return a
+        _time.sleep(0.001)
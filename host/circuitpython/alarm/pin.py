@@ -0,0 +1,15 @@
+"""
+alarm.pin (host stand-in)
+
+Level alarms only, like the ESP32 ports; edge=True raises.
+"""
+
+
+class PinAlarm:
+    def __init__(self, pin, value: bool, edge: bool = False, pull: bool = False):
+        if edge:
+            raise NotImplementedError("Cannot wake on pin edge. Only level.")
+        self.pin = pin
+        self.value = value
+        self.edge = edge
+        self.pull = pull
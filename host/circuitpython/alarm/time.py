@@ -0,0 +1,10 @@
+"""
+alarm.time (host stand-in)
+"""
+
+
+class TimeAlarm:
+    def __init__(self, *, monotonic_time=None, epoch_time=None):
+        if monotonic_time is None:
+            raise NotImplementedError("only monotonic_time is simulated")
+        self.monotonic_time = monotonic_time
@@ -0,0 +1,30 @@
+"""
+board.py (host stand-in)
+
+Virtual pins for the XIAO ESP32-C3. Scripts drive inputs by setting
+``pin.level``; inputs with a pull-up idle high.
+"""
+
+
+class Pin:
+    def __init__(self, name: str):
+        self.name = name
+        self.level = True
+
+    def __repr__(self):
+        return "board." + self.name
+
+
+D0 = Pin("D0")
+D1 = Pin("D1")
+D2 = Pin("D2")
+D3 = Pin("D3")
+D4 = Pin("D4")
+D5 = Pin("D5")
+D6 = Pin("D6")
+D7 = Pin("D7")
+D8 = Pin("D8")
+D9 = Pin("D9")
+D10 = Pin("D10")
+SDA = D4
+SCL = D5
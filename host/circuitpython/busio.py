@@ -0,0 +1,61 @@
+"""
+busio.py (host stand-in)
+
+Fake I2C bus. Devices are plain objects registered by address that
+implement ``write(data)`` and ``read(n) -> bytes``. Every transaction is
+counted so benchmarks can report bus traffic.
+"""
+
+
+class I2C:
+    def __init__(self, scl, sda, *, frequency=100000, timeout=255):
+        self.frequency = frequency
+        self.devices = {}
+        self.transactions = 0
+        self.bytes_written = 0
+        self.bytes_read = 0
+        self._locked = False
+
+    def attach(self, address: int, device) -> None:
+        self.devices[address] = device
+
+    def scan(self):
+        return sorted(self.devices)
+
+    def try_lock(self) -> bool:
+        if self._locked:
+            return False
+        self._locked = True
+        return True
+
+    def unlock(self) -> None:
+        self._locked = False
+
+    def _device(self, address):
+        try:
+            return self.devices[address]
+        except KeyError:
+            raise OSError(19, "No I2C device at 0x{:02x}".format(address))
+
+    def writeto(self, address, buffer, *, start=0, end=None):
+        data = bytes(buffer[start:end])
+        self.transactions += 1
+        self.bytes_written += len(data)
+        self._device(address).write(data)
+
+    def readfrom_into(self, address, buffer, *, start=0, end=None):
+        if end is None:
+            end = len(buffer)
+        data = self._device(address).read(end - start)
+        self.transactions += 1
+        self.bytes_read += len(data)
+        buffer[start:end] = data
+
+    def writeto_then_readfrom(
+        self, address, out_buffer, in_buffer, *, out_start=0, out_end=None, in_start=0, in_end=None
+    ):
+        self.writeto(address, out_buffer, start=out_start, end=out_end)
+        self.readfrom_into(address, in_buffer, start=in_start, end=in_end)
+
+    def deinit(self):
+        pass
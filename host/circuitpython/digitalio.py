@@ -0,0 +1,43 @@
+"""
+digitalio.py (host stand-in)
+
+DigitalInOut over the virtual pins in board.py.
+"""
+
+
+class Direction:
+    INPUT = "INPUT"
+    OUTPUT = "OUTPUT"
+
+
+class Pull:
+    UP = "UP"
+    DOWN = "DOWN"
+
+
+class DigitalInOut:
+    def __init__(self, pin):
+        self._pin = pin
+        self.direction = Direction.INPUT
+        self.pull = None
+        self.reads = 0
+
+    def switch_to_input(self, pull=None):
+        self.direction = Direction.INPUT
+        self.pull = pull
+
+    def switch_to_output(self, value=False, **kwargs):
+        self.direction = Direction.OUTPUT
+        self._pin.level = value
+
+    @property
+    def value(self):
+        self.reads += 1
+        return self._pin.level
+
+    @value.setter
+    def value(self, value):
+        self._pin.level = bool(value)
+
+    def deinit(self):
+        pass
@@ -0,0 +1,151 @@
+"""
+displayio.py (host stand-in)
+
+Just enough of displayio for Thunder Fighter to run on a laptop. Every
+object constructed is counted in ``created`` so benchmarks can report
+display allocations per frame.
+"""
+
+created = {}
+
+
+def _count(kind: str) -> None:
+    created[kind] = created.get(kind, 0) + 1
+
+
+def objects_created() -> int:
+    return sum(created.values())
+
+
+def release_displays() -> None:
+    pass
+
+
+class Group:
+    def __init__(self, *, scale=1, x=0, y=0):
+        _count("Group")
+        self.scale = scale
+        self.x = x
+        self.y = y
+        self.hidden = False
+        self._children = []
+
+    def append(self, layer) -> None:
+        self._children.append(layer)
+
+    def insert(self, index, layer) -> None:
+        self._children.insert(index, layer)
+
+    def remove(self, layer) -> None:
+        self._children.remove(layer)
+
+    def pop(self, i=-1):
+        return self._children.pop(i)
+
+    def index(self, layer) -> int:
+        return self._children.index(layer)
+
+    def __len__(self):
+        return len(self._children)
+
+    def __getitem__(self, index):
+        return self._children[index]
+
+    def __setitem__(self, index, layer):
+        self._children[index] = layer
+
+    def __contains__(self, layer):
+        return layer in self._children
+
+
+class Bitmap:
+    def __init__(self, width: int, height: int, value_count: int):
+        _count("Bitmap")
+        self.width = width
+        self.height = height
+        self.value_count = value_count
+        self._data = bytearray(width * height)
+
+    def _index(self, key):
+        if isinstance(key, tuple):
+            x, y = key
+            if not (0 <= x < self.width and 0 <= y < self.height):
+                raise IndexError("pixel out of bounds")
+            return y * self.width + x
+        return key
+
+    def __getitem__(self, key):
+        return self._data[self._index(key)]
+
+    def __setitem__(self, key, value):
+        self._data[self._index(key)] = value
+
+    def fill(self, value: int) -> None:
+        for i in range(len(self._data)):
+            self._data[i] = value
+
+
+class Palette:
+    def __init__(self, color_count: int):
+        _count("Palette")
+        self._colors = [0] * color_count
+        self._transparent = set()
+
+    def __len__(self):
+        return len(self._colors)
+
+    def __getitem__(self, index):
+        return self._colors[index]
+
+    def __setitem__(self, index, color):
+        self._colors[index] = color
+
+    def make_transparent(self, index: int) -> None:
+        self._transparent.add(index)
+
+    def make_opaque(self, index: int) -> None:
+        self._transparent.discard(index)
+
+    def is_transparent(self, index: int) -> bool:
+        return index in self._transparent
+
+
+class TileGrid:
+    def __init__(
+        self,
+        bitmap,
+        *,
+        pixel_shader,
+        width=1,
+        height=1,
+        tile_width=None,
+        tile_height=None,
+        default_tile=0,
+        x=0,
+        y=0,
+    ):
+        _count("TileGrid")
+        self.bitmap = bitmap
+        self.pixel_shader = pixel_shader
+        self.width = width
+        self.height = height
+        self.tile_width = tile_width or bitmap.width
+        self.tile_height = tile_height or bitmap.height
+        self.x = x
+        self.y = y
+        self.hidden = False
+        self._tiles = bytearray([default_tile] * (width * height))
+        self.tile_writes = 0
+
+    def _index(self, key):
+        if isinstance(key, tuple):
+            x, y = key
+            return y * self.width + x
+        return key
+
+    def __getitem__(self, key):
+        return self._tiles[self._index(key)]
+
+    def __setitem__(self, key, tile):
+        self.tile_writes += 1
+        self._tiles[self._index(key)] = tile
@@ -0,0 +1,17 @@
+"""
+i2cdisplaybus.py (host stand-in)
+"""
+
+
+class I2CDisplayBus:
+    def __init__(self, i2c_bus, *, device_address, reset=None):
+        self.i2c = i2c_bus
+        self.device_address = device_address
+        i2c_bus.attach(device_address, self)
+
+    # The fake bus treats the display as a sink for command/data bytes
+    def write(self, data):
+        pass
+
+    def read(self, n):
+        return bytes(n)
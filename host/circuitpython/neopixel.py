@@ -0,0 +1,37 @@
+"""
+neopixel.py (host stand-in)
+
+Keeps pixel colours in memory and counts writes to the strip.
+"""
+
+
+class NeoPixel:
+    def __init__(self, pin, n, *, brightness=1.0, auto_write=True, pixel_order=None):
+        self.pin = pin
+        self.n = n
+        self.brightness = brightness
+        self.auto_write = auto_write
+        self._pixels = [(0, 0, 0)] * n
+        self.writes = 0
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, index):
+        return self._pixels[index]
+
+    def __setitem__(self, index, color):
+        self._pixels[index] = tuple(color)
+        if self.auto_write:
+            self.show()
+
+    def fill(self, color):
+        self._pixels = [tuple(color)] * self.n
+        if self.auto_write:
+            self.show()
+
+    def show(self):
+        self.writes += 1
+
+    def deinit(self):
+        pass
@@ -0,0 +1,31 @@
+"""
+rotaryio.py (host stand-in)
+
+IncrementalEncoder that counts in the "background": scripts add edges
+with turn(pin_a, edges) and they are there on the next position read,
+however long ago update() last ran.
+"""
+
+_encoders = {}
+
+
+class IncrementalEncoder:
+    def __init__(self, pin_a, pin_b, divisor: int = 4):
+        self._divisor = divisor
+        self._edges = 0
+        self.position = 0
+        _encoders[pin_a.name] = self
+
+    def _count(self, edges: int) -> None:
+        self._edges += edges
+        self.position += self._edges // self._divisor - (self._edges - edges) // self._divisor
+
+    def deinit(self) -> None:
+        for name, encoder in list(_encoders.items()):
+            if encoder is self:
+                del _encoders[name]
+
+
+def turn(pin_a, edges: int) -> None:
+    """Feed quadrature edges (negative = counter-clockwise) to the encoder on pin_a."""
+    _encoders[pin_a.name]._count(edges)
@@ -0,0 +1,11 @@
+"""
+terminalio.py (host stand-in)
+"""
+
+
+class _BuiltinFont:
+    def get_bounding_box(self):
+        return (6, 12)
+
+
+FONT = _BuiltinFont()
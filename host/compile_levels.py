@@ -0,0 +1,107 @@
+"""
+compile_levels.py
+
+Compile the text level source into the binary pack levels.py reads.
+
+    python host/compile_levels.py [host/levels.txt] [--out src/levels.bin]
+
+See host/levels.txt for the source format and src/levels.py for the
+binary layout.
+"""
+
+import argparse
+import os
+import struct
+import sys
+
+import harness
+
+harness.install()
+
+import levels  # noqa: E402
+
+LANES = 8
+
+
+def parse(path: str):
+    """Returns a list of (spawns, speed, interval_ms)."""
+    parsed = []
+    with open(path) as f:
+        for number, line in enumerate(f, 1):
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            spawns = []
+            speed = levels.DEFAULT_SPEED
+            interval = levels.DEFAULT_INTERVAL_MS
+            for word in line.split():
+                if word.startswith("speed="):
+                    speed = int(word[6:])
+                elif word.startswith("interval="):
+                    interval = int(word[9:])
+                else:
+                    spawns.append(int(word))
+
+            where = "{}:{}".format(path, number)
+            if not spawns:
+                raise ValueError(where + ": level has no spawns")
+            if len(spawns) > 255:
+                raise ValueError(where + ": more than 255 spawns")
+            if not all(0 <= lane < LANES for lane in spawns):
+                raise ValueError(where + ": lanes are 0-{}".format(LANES - 1))
+            if not 1 <= speed <= 255:
+                raise ValueError(where + ": speed is 1-255 percent")
+            if not 1 <= interval <= 0xFFFF:
+                raise ValueError(where + ": interval is 1-65535 ms")
+            parsed.append((spawns, speed, interval))
+    return parsed
+
+
+def compile_pack(parsed) -> bytes:
+    body = bytearray()
+    offsets = []
+    base = levels.HEADER_SIZE + levels.INDEX_SIZE * len(parsed)
+    for spawns, speed, interval in parsed:
+        offsets.append(base + len(body))
+        flags = 0
+        if speed != levels.DEFAULT_SPEED:
+            flags |= levels.FLAG_SPEED
+        if interval != levels.DEFAULT_INTERVAL_MS:
+            flags |= levels.FLAG_INTERVAL
+        body += struct.pack(levels.LEVEL, len(spawns), flags)
+        if flags & levels.FLAG_SPEED:
+            body += struct.pack("<B", speed)
+        if flags & levels.FLAG_INTERVAL:
+            body += struct.pack("<H", interval)
+        body += bytes(spawns)
+
+    if base + len(body) > 0xFFFF:
+        raise ValueError("level pack larger than 64 KiB")
+
+    longest = max(len(spawns) for spawns, _, _ in parsed)
+    header = struct.pack(levels.HEADER, levels.MAGIC, levels.VERSION, LANES, len(parsed), longest)
+    index = b"".join(struct.pack(levels.INDEX, offset) for offset in offsets)
+    return header + index + bytes(body)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("source", nargs="?", default=os.path.join(harness.HOST_DIR, "levels.txt"))
+    parser.add_argument("--out", default=os.path.join(harness.SRC_DIR, "levels.bin"))
+    args = parser.parse_args()
+
+    try:
+        parsed = parse(args.source)
+        pack = compile_pack(parsed)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    with open(args.out, "wb") as f:
+        f.write(pack)
+    print("{}: {} levels, {} bytes".format(args.out, len(parsed), len(pack)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+"""
+harness.py
+
+Host-side simulation harness for Thunder Fighter.
+
+install() puts the CircuitPython stand-ins (host/circuitpython) and the
+game sources (src/) on sys.path, so thunder.py, difficulty.py,
+highscore.py, rotary_encoder.py, ... import unchanged on a laptop.
+
+The stand-ins provide:
+- board / digitalio : virtual GPIO, drive inputs via ``board.D2.level``
+- busio             : fake I2C bus counting transactions and bytes
+- adafruit_adxl34x  : ADXL345 driver over a scriptable FakeADXL345
+- displayio         : counts every object constructed
+- adafruit_displayio_ssd1306 : recording display
+- rotaryio          : background-counting encoder, feed edges with turn()
+- alarm             : light_sleep_until_alarms() with TimeAlarm and level PinAlarm
+"""
+
+import os
+import sys
+
+HOST_DIR = os.path.dirname(os.path.abspath(__file__))
+SHIM_DIR = os.path.join(HOST_DIR, "circuitpython")
+SRC_DIR = os.path.join(os.path.dirname(HOST_DIR), "src")
+
+
+def install() -> None:
+    """
+    Put the stand-ins first, so they replace installed packages of the
+    same name, and src/ straight after the standard library: src/code.py
+    must not shadow the stdlib code module (pdb, python -i and IPython
+    import it). host/ goes behind src/, where replay.py exists in both.
+    """
+    paths = [p for p in sys.path if os.path.abspath(p or ".") not in (SHIM_DIR, SRC_DIR, HOST_DIR)]
+
+    stdlib = os.path.dirname(os.__file__)
+    end = 0
+    for i, path in enumerate(paths):
+        if path == stdlib or (path.startswith(stdlib + os.sep) and "site-packages" not in path):
+            end = i + 1
+
+    sys.path[:] = [SHIM_DIR] + paths[:end] + [SRC_DIR, HOST_DIR] + paths[end:]
+
+
+def make_display(width: int = 128, height: int = 64):
+    """Build the same bus / display stack as code.py. Returns (i2c, display)."""
+    install()
+    import board
+    import busio
+    import i2cdisplaybus
+    import adafruit_displayio_ssd1306
+
+    i2c = busio.I2C(board.SCL, board.SDA)
+    display_bus = i2cdisplaybus.I2CDisplayBus(i2c, device_address=0x3C)
+    display = adafruit_displayio_ssd1306.SSD1306(display_bus, width=width, height=height)
+    return i2c, display
+
+
+def press(pin, pressed: bool = True) -> None:
+    """Drive an active-low button pin."""
+    pin.level = not pressed
@@ -0,0 +1,118 @@
+"""
+replay.py
+
+Replay a recorded Thunder Fighter session on the host.
+
+Feeds the recorded (dt, dx, dy, buttons) stream through the same
+FrameScheduler / handle_input_fp() / update_ms() / draw() sequence as code.py
+and reports how the game ended plus update/draw frame times, so two
+builds can be compared on exactly the same input.
+
+    python host/replay.py session.tfr
+    python host/replay.py --serial console.log --out session.tfr
+"""
+
+import argparse
+import binascii
+import io
+import time
+
+import harness
+
+harness.install()
+
+from replay import InputReplay, SERIAL_PREFIX  # noqa: E402
+from scheduler import FrameScheduler  # noqa: E402
+from thunder import ThunderFighterGame  # noqa: E402
+
+
+def session_from_serial(path: str) -> bytes:
+    """Collect the hex records a SerialSink printed into a console log."""
+    data = bytearray()
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith(SERIAL_PREFIX):
+                data += binascii.unhexlify(line[len(SERIAL_PREFIX) :])
+    return bytes(data)
+
+
+def run(session: bytes, render_hz: int = 25) -> dict:
+    replay = InputReplay(io.BytesIO(session))
+    _, display = harness.make_display()
+    name = replay.difficulty or "EASY"
+    game = ThunderFighterGame(display, name)
+    game.reset(name)
+    scheduler = FrameScheduler(replay.sim_hz, render_hz)
+
+    update_ns = 0
+    draw_ns = 0
+    worst_ns = 0
+    status = "running"
+    while status == "running":
+        frame_input = replay.next()
+        if frame_input is None:
+            break
+        dt_ms, dx, dy, invincible_pressed, _ = frame_input
+
+        t0 = time.perf_counter_ns()
+        game.handle_input_fp(dx, dy, invincible_pressed)
+        if replay.fixed:
+            for _ in range(scheduler.advance(dt_ms)):
+                status = game.update_ms(scheduler.next_step_ms())
+                if status != "running":
+                    break
+            render = scheduler.render_due()
+        else:
+            status = game.update_ms(dt_ms)
+            render = True
+        t1 = time.perf_counter_ns()
+        if render:
+            game.draw()
+        t2 = time.perf_counter_ns()
+
+        update_ns += t1 - t0
+        draw_ns += t2 - t1
+        worst_ns = max(worst_ns, t2 - t0)
+
+    frames = max(1, replay.frames)
+    return {
+        "difficulty": name,
+        "status": status,
+        "level": game.current_level,
+        "score": game.score,
+        "frames": replay.frames,
+        "update_us": update_ns / frames / 1000,
+        "draw_us": draw_ns / frames / 1000,
+        "worst_us": worst_ns / 1000,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("session", nargs="?", help="recorded session file")
+    parser.add_argument("--serial", help="console log with TFR: lines to read instead")
+    parser.add_argument("--out", help="save the session decoded from --serial here")
+    parser.add_argument("--render-hz", type=int, default=25)
+    args = parser.parse_args()
+
+    if args.serial:
+        session = session_from_serial(args.serial)
+        if args.out:
+            with open(args.out, "wb") as f:
+                f.write(session)
+    elif args.session:
+        with open(args.session, "rb") as f:
+            session = f.read()
+    else:
+        parser.error("give a session file or --serial")
+
+    r = run(session, args.render_hz)
+    print(
+        "{difficulty}: {status} at level {level}, score {score}, {frames} frames, "
+        "update {update_us:.1f} us, draw {draw_us:.1f} us, worst {worst_us:.1f} us".format(**r)
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,13 @@
+"""
+Puts host/ on sys.path and installs the harness, so the tests import the
+game modules the same way the host tools do.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import harness  # noqa: E402
+
+harness.install()
@@ -0,0 +1,25 @@
+"""
+Import layout set up by harness.install().
+"""
+
+import os
+
+import harness
+
+
+def test_stdlib_code_is_not_shadowed():
+    # pdb (pytest's debugging plugin), python -i and IPython import it;
+    # src/code.py in its place would start the game loop
+    import code
+
+    assert hasattr(code, "InteractiveConsole")
+    assert not code.__file__.startswith(harness.SRC_DIR)
+
+
+def test_game_modules_come_from_src():
+    # host/replay.py shares its name with src/replay.py
+    import replay
+    import thunder
+
+    assert os.path.dirname(replay.__file__) == harness.SRC_DIR
+    assert os.path.dirname(thunder.__file__) == harness.SRC_DIR
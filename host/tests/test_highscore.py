@@ -0,0 +1,109 @@
+"""
+Power-loss recovery of the high score log (src/highscore.py).
+
+Each test runs in its own temporary directory, so the log, its temp file
+and the legacy highscores.txt never touch the real CIRCUITPY files.
+"""
+
+import os
+import struct
+
+import pytest
+
+import highscore
+from highscore import HighScoreManager, RECORD_SIZE
+
+BOARDS = ("EASY", "MEDIUM", "HARD")
+
+
+@pytest.fixture(autouse=True)
+def in_tmp(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+
+def saved(scores, board="EASY", **kwargs):
+    manager = HighScoreManager(boards=BOARDS, **kwargs)
+    for score in scores:
+        manager.add_score(score, board)
+        assert manager.flush()
+    return manager
+
+
+def test_scores_survive_a_reload():
+    saved([3, 7, 5])
+    manager = HighScoreManager(boards=BOARDS)
+    assert manager.get_scores("EASY") == [7, 5, 3]
+    assert manager.get_scores("HARD") == [0, 0, 0]
+    assert not manager.pending()
+
+
+def test_torn_trailing_record_is_skipped_and_compacted():
+    saved([4, 9])
+    with open(highscore.DEFAULT_FILE, "ab") as f:
+        # Power lost part way through appending a third record
+        f.write(bytes([highscore.RECORD_TAG, 0, 12]))
+
+    manager = HighScoreManager(boards=BOARDS)
+    assert manager.get_scores("EASY") == [9, 4, 0]
+    assert manager.skipped_bytes == 3
+    assert manager.pending()
+
+    assert manager.flush()
+    assert manager.compactions == 1
+    assert os.path.getsize(highscore.DEFAULT_FILE) == 2 * RECORD_SIZE
+
+    reloaded = HighScoreManager(boards=BOARDS)
+    assert reloaded.get_scores("EASY") == [9, 4, 0]
+    assert reloaded.skipped_bytes == 0
+
+
+def test_corrupt_record_resyncs_on_the_next_one():
+    saved([6])
+    with open(highscore.DEFAULT_FILE, "ab") as f:
+        f.write(b"\xff\x00")
+        # A good MEDIUM record straight after the garbage
+        f.write(struct.pack(highscore.RECORD, highscore.RECORD_TAG, 1, 8, highscore._checksum(1, 8)))
+
+    manager = HighScoreManager(boards=BOARDS)
+    assert manager.get_scores("EASY") == [6, 0, 0]
+    assert manager.get_scores("MEDIUM") == [8, 0, 0]
+    assert manager.skipped_bytes == 2
+
+
+def test_leftover_temp_file_alone_is_recovered():
+    saved([2, 5], board="HARD")
+    # Power lost after the log was removed, before the temp file replaced it
+    os.rename(highscore.DEFAULT_FILE, highscore.DEFAULT_FILE + ".tmp")
+
+    manager = HighScoreManager(boards=BOARDS)
+    assert manager.get_scores("HARD") == [5, 2, 0]
+    assert manager.pending()
+
+    assert manager.flush()
+    assert os.path.exists(highscore.DEFAULT_FILE)
+    assert not os.path.exists(highscore.DEFAULT_FILE + ".tmp")
+    assert HighScoreManager(boards=BOARDS).get_scores("HARD") == [5, 2, 0]
+
+
+def test_temp_file_next_to_the_log_is_discarded():
+    saved([5])
+    with open(highscore.DEFAULT_FILE + ".tmp", "wb") as f:
+        # Half-written compaction: the log is still the complete copy
+        f.write(bytes([highscore.RECORD_TAG]))
+
+    manager = HighScoreManager(boards=BOARDS)
+    assert manager.get_scores("EASY") == [5, 0, 0]
+    assert not os.path.exists(highscore.DEFAULT_FILE + ".tmp")
+
+
+def test_max_records_triggers_compaction():
+    # max_records is raised to two full sets of boards: 2 * 3 * 3 = 18
+    manager = saved(range(1, 19), max_records=6)
+    assert manager.compactions == 0
+    assert os.path.getsize(highscore.DEFAULT_FILE) == 18 * RECORD_SIZE
+
+    manager.add_score(19, "EASY")
+    assert manager.flush()
+    assert manager.compactions == 1
+    assert os.path.getsize(highscore.DEFAULT_FILE) == 3 * RECORD_SIZE
+    assert HighScoreManager(boards=BOARDS).get_scores("EASY") == [19, 18, 17]
@@ -2,10 +2,57 @@
 accelerometer.py
 
 ADXL345 helper for Thunder Fighter.
+
+Two sampling modes:
+- direct (default): every get_tilt() reads the current sample over I2C
+- FIFO (enable_fifo): the ADXL345 samples at a fixed output data rate
+  into its 32-entry FIFO (stream mode); get_tilt() drains all queued
+  samples in one locked burst at most every poll_ms, filters them as a
+  batch and returns the cached tilt in between
+
+Both read raw registers and filter in integer mm/s^2. get_tilt_fp()
+returns that tilt as a cached tuple that is only rebuilt when it
+changes; get_tilt() is the float m/s^2 version of the same values.
+
+Calibration can run blocking (calibrate()) or incrementally through a
+Calibration object (begin_calibration()) stepped from the main loop.
+Both start by emptying the FIFO, and read_xy() takes the mean of the
+entries queued since its last call: popping one entry at a time would
+return samples hundreds of ms old from a full FIFO.
 """
 
 import time
 import adafruit_adxl34x
+from adafruit_bus_device.i2c_device import I2CDevice
+from adafruit_ticks import ticks_ms, ticks_add, ticks_diff
+
+_ADXL345_ADDRESS = 0x53
+_REG_BW_RATE = 0x2C
+_REG_DATAX0 = 0x32
+_REG_FIFO_CTL = 0x38
+_REG_FIFO_STATUS = 0x39
+
+_FIFO_BYPASS = 0x00
+_FIFO_STREAM = 0x80
+_FIFO_ENTRIES_MASK = 0x3F
+
+# 1000 * mm/s^2 per LSB (4 mg), same scale adafruit_adxl34x uses
+_UMS2_PER_LSB = 39227
+
+# (output data rate in Hz, BW_RATE code)
+_DATA_RATES = (
+    (12, 0b0111),
+    (25, 0b1000),
+    (50, 0b1001),
+    (100, 0b1010),
+    (200, 0b1011),
+    (400, 0b1100),
+)
+
+
+def _s16(lo: int, hi: int) -> int:
+    v = lo | (hi << 8)
+    return v - 0x10000 if v & 0x8000 else v
 
 
 class Accelerometer:
@@ -13,52 +60,303 @@ class Accelerometer:
         """
         i2c: I2C object from busio.I2C
         alpha: low-pass filter factor
-        deadzone: ignore very small movements near 0g
+        deadzone: ignore very small movements near 0g (m/s^2)
         """
+        self._i2c = i2c
         self._sensor = adafruit_adxl34x.ADXL345(i2c)
-        self._alpha = alpha
-        self._deadzone = deadzone
+        self._device = I2CDevice(i2c, _ADXL345_ADDRESS)
+
+        # Filter state in integer mm/s^2, alpha in per-mille
+        self._alpha = int(alpha * 1000 + 0.5)
+        self._deadzone = int(deadzone * 1000 + 0.5)
+        self._base_x = 0
+        self._base_y = 0
+        self._fx = 0
+        self._fy = 0
+        self._tilt = (0, 0)
+
+        self._fifo = False
+        self._reg = bytearray(1)
+        self._buf = bytearray(6)
+        self._poll_ms = 0
+        self._last_poll = 0
+
+        self.data_rate_hz = 0
+        self.transactions = 0
+        self.samples = 0
+
+    def enable_fifo(self, rate_hz: int = 50, poll_ms: int = None) -> None:
+        """
+        rate_hz: wanted output data rate, rounded up to one the ADXL345 has
+        poll_ms: minimum time between FIFO drains, defaults to two samples
+        """
+        hz, code = _DATA_RATES[-1]
+        for rate in _DATA_RATES:
+            if rate[0] >= rate_hz:
+                hz, code = rate
+                break
+
+        self._fifo = True
+        self._write(_REG_BW_RATE, code)
+        # Toggle through bypass to empty the FIFO, then stream
+        self._write(_REG_FIFO_CTL, _FIFO_BYPASS)
+        self._write(_REG_FIFO_CTL, _FIFO_STREAM)
+
+        self.data_rate_hz = hz
+        self._poll_ms = poll_ms if poll_ms is not None else 2000 // hz
+        self._last_poll = ticks_ms()
 
-        self._base_x = 0.0
-        self._base_y = 0.0
+    def disable_fifo(self) -> None:
+        if self._fifo:
+            self._write(_REG_FIFO_CTL, _FIFO_BYPASS)
+            self._fifo = False
 
-        self._fx = 0.0
-        self._fy = 0.0
+    def _write(self, register: int, value: int) -> None:
+        self._buf[0] = register
+        self._buf[1] = value
+        with self._device as dev:
+            dev.write(self._buf, end=2)
+        self.transactions += 1
 
     def calibrate(self, samples: int = 30, delay: float = 0.05) -> None:
         sx = 0.0
         sy = 0.0
+        n = 0
 
-        for _ in range(samples):
-            x, y, z = self._sensor.acceleration
-            sx += x
-            sy += y
+        if self._fifo:
+            self._drain_fifo()
+        while n < samples:
             time.sleep(delay)
+            xy = self.read_xy()
+            if xy is None:
+                continue
+            sx += xy[0]
+            sy += xy[1]
+            n += 1
 
-        self._base_x = sx / samples
-        self._base_y = sy / samples
+        self.set_baseline(sx / samples, sy / samples)
 
-        self._fx = 0.0
-        self._fy = 0.0
+    def begin_calibration(self, **kwargs):
+        """Start a non-blocking calibration, see Calibration for options."""
+        if self._fifo:
+            # Whatever is queued was sampled before HOLD STILL was shown
+            self._drain_fifo()
+        return Calibration(self, **kwargs)
+
+    def read_xy(self):
+        """
+        Current (x, y) in m/s^2. In FIFO mode the mean of the entries
+        queued since the last read, or None if none have arrived yet.
+        """
+        if self._fifo:
+            count, sx, sy = self._drain_fifo()
+            if not count:
+                return None
+            div = 1000000 * count
+            return sx * _UMS2_PER_LSB / div, sy * _UMS2_PER_LSB / div
 
-    def get_tilt(self):
         x, y, z = self._sensor.acceleration
+        self.transactions += 1
+        return x, y
+
+    def set_baseline(self, base_x: float, base_y: float) -> None:
+        """base_x, base_y: resting reading in m/s^2."""
+        self._base_x = int(base_x * 1000 + (0.5 if base_x >= 0 else -0.5))
+        self._base_y = int(base_y * 1000 + (0.5 if base_y >= 0 else -0.5))
+
+        self._fx = 0
+        self._fy = 0
+        self._tilt = (0, 0)
+
+        if self._fifo:
+            # Samples queued during calibration are stale
+            self._drain_fifo()
+            self._last_poll = ticks_ms()
+
+    def _drain_fifo(self):
+        """
+        Read every queued FIFO entry under a single bus lock.
+        Returns (count, sum_x, sum_y) in raw LSBs.
+        """
+        reg = self._reg
+        buf = self._buf
+        sx = 0
+        sy = 0
+        with self._device as dev:
+            reg[0] = _REG_FIFO_STATUS
+            dev.write_then_readinto(reg, buf, in_end=1)
+            count = buf[0] & _FIFO_ENTRIES_MASK
+
+            # Each 6-byte read of DATAX0..DATAZ1 pops one entry
+            reg[0] = _REG_DATAX0
+            for _ in range(count):
+                dev.write_then_readinto(reg, buf)
+                sx += _s16(buf[0], buf[1])
+                sy += _s16(buf[2], buf[3])
+
+        self.transactions += 1 + count
+        self.samples += count
+        return count, sx, sy
+
+    def _read_raw(self):
+        """One DATAX0..DATAZ1 read. Returns (x, y) in raw LSBs."""
+        reg = self._reg
+        buf = self._buf
+        with self._device as dev:
+            reg[0] = _REG_DATAX0
+            dev.write_then_readinto(reg, buf)
+        self.transactions += 1
+        self.samples += 1
+        return _s16(buf[0], buf[1]), _s16(buf[2], buf[3])
+
+    def get_tilt_fp(self):
+        """Filtered tilt as (dx, dy) in integer mm/s^2."""
+        if not self._fifo:
+            x, y = self._read_raw()
+            return self._filter(x, y, 1)
+
+        now = ticks_ms()
+        if ticks_diff(now, self._last_poll) < self._poll_ms:
+            return self._tilt
+        self._last_poll = now
+
+        count, sx, sy = self._drain_fifo()
+        if count:
+            # Batch mean, then one filter step
+            return self._filter(sx, sy, count)
+        return self._tilt
+
+    def get_tilt(self):
+        """Filtered tilt as (dx, dy) in m/s^2."""
+        dx, dy = self.get_tilt_fp()
+        return dx / 1000, dy / 1000
+
+    def _filter(self, sx: int, sy: int, count: int):
+        """sx, sy: sums of count raw samples."""
+        div = 1000 * count
+        half = div // 2
+        dx_raw = (sx * _UMS2_PER_LSB + half) // div - self._base_x
+        dy_raw = (sy * _UMS2_PER_LSB + half) // div - self._base_y
+
+        a = self._alpha
+        self._fx = (a * dx_raw + (1000 - a) * self._fx + 500) // 1000
+        self._fy = (a * dy_raw + (1000 - a) * self._fy + 500) // 1000
+
+        dz = self._deadzone
+        dx = 0 if -dz < self._fx < dz else self._fx
+        dy = 0 if -dz < self._fy < dz else self._fy
+
+        # Reuse the tuple while the tilt is steady
+        tilt = self._tilt
+        if dx != tilt[0] or dy != tilt[1]:
+            self._tilt = (dx, dy)
+        return self._tilt
+
+
+class Calibration:
+    def __init__(
+        self,
+        accel,
+        *,
+        interval_ms: int = 20,
+        min_samples: int = 8,
+        max_samples: int = 30,
+        tolerance: float = 0.1,
+        timeout_ms: int = 5000,
+    ):
+        """
+        accel: Accelerometer to calibrate
+        interval_ms: time between samples
+        min_samples: samples needed before it may finish
+        max_samples: samples after which an unsteady run restarts
+        tolerance: largest standard deviation (m/s^2) counted as still
+        timeout_ms: give up waiting and use the latest mean after this,
+            or the previous baseline if no sample arrived
+        """
+        self._accel = accel
+        self._interval_ms = interval_ms
+        self._min_samples = max(2, min_samples)
+        self._max_samples = max(self._min_samples, max_samples)
+        self._tol_sq = tolerance * tolerance
+        self._tolerance = tolerance
+        self._timeout_ms = timeout_ms
+
+        self._start = ticks_ms()
+        self._last = ticks_add(self._start, -interval_ms)
+
+        self.done = False
+        self.stable = False
+        self.restarts = 0
+        self.elapsed_ms = 0
+        self._reset_stats()
+
+    def _reset_stats(self) -> None:
+        # Welford running mean / variance per axis
+        self.count = 0
+        self._mean_x = 0.0
+        self._mean_y = 0.0
+        self._m2_x = 0.0
+        self._m2_y = 0.0
+
+    def _add(self, x: float, y: float) -> None:
+        self.count += 1
+        n = self.count
+        d = x - self._mean_x
+        self._mean_x += d / n
+        self._m2_x += d * (x - self._mean_x)
+        d = y - self._mean_y
+        self._mean_y += d / n
+        self._m2_y += d * (y - self._mean_y)
+
+    def _variance(self) -> float:
+        if self.count < 2:
+            return 0.0
+        return max(self._m2_x, self._m2_y) / (self.count - 1)
+
+    def step(self) -> bool:
+        """Take a sample if one is due. Returns True once calibration is done."""
+        if self.done:
+            return True
+
+        now = ticks_ms()
+        if ticks_diff(now, self._last) < self._interval_ms:
+            return False
+        self._last = now
+        self.elapsed_ms = ticks_diff(now, self._start)
+
+        xy = self._accel.read_xy()
+        if xy is None:
+            # A stalled FIFO must not hold calibration open forever
+            if self.elapsed_ms >= self._timeout_ms:
+                return self._finish()
+            return False
+        x, y = xy
 
-        dx_raw = x - self._base_x
-        dy_raw = y - self._base_y
+        # A jump well outside the tolerance means the device is moving
+        if self.count >= 2 and (
+            abs(x - self._mean_x) > 4 * self._tolerance
+            or abs(y - self._mean_y) > 4 * self._tolerance
+        ):
+            self.restarts += 1
+            self._reset_stats()
 
-        self._fx = self._alpha * dx_raw + (1.0 - self._alpha) * self._fx
-        self._fy = self._alpha * dy_raw + (1.0 - self._alpha) * self._fy
+        self._add(x, y)
 
-        if -self._deadzone < self._fx < self._deadzone:
-            dx = 0.0
-        else:
-            dx = self._fx
+        if self.count >= self._min_samples and self._variance() <= self._tol_sq:
+            self.stable = True
+            return self._finish()
 
-        if -self._deadzone < self._fy < self._deadzone:
-            dy = 0.0
-        else:
-            dy = self._fy
+        if self.elapsed_ms >= self._timeout_ms:
+            return self._finish()
 
-        return dx, dy
+        if self.count >= self._max_samples:
+            self.restarts += 1
+            self._reset_stats()
+        return False
 
+    def _finish(self) -> bool:
+        # With no samples the previous (or zero) baseline is kept
+        if self.count:
+            self._accel.set_baseline(self._mean_x, self._mean_y)
+        self.done = True
+        return True
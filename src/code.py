@@ -4,7 +4,8 @@ code.py
 Entry point for the ESP32.
 
 On power-up:
-- Shows an animated splash screen.
+- Shows an animated splash screen while the hardware is set up
+  (button press skips it, a "fastboot" file on CIRCUITPY disables it).
 - Shows a difficulty selection menu using the rotary encoder and SSD1306 OLED.
 - After a difficulty is chosen, it shows "HOLD STILL" and calibrates the accelerometer.
 - Then it enters PLAYING where ThunderFighterGame runs the game.
@@ -14,12 +15,10 @@ On power-up:
 
 import time
 import board
+from adafruit_ticks import ticks_ms, ticks_diff
 from rotary_encoder import RotaryEncoder
 
-import busio
 import displayio
-import terminalio
-from adafruit_display_text import label
 import i2cdisplaybus
 import adafruit_displayio_ssd1306
 import digitalio
@@ -27,267 +26,689 @@ from adafruit_debouncer import Debouncer
 
 from difficulty import Difficulty
 from accelerometer import Accelerometer
-from thunder import ThunderFighterGame
+from thunder import ThunderFighterGame, IDLE_TIMEOUT_MS
+from levels import LevelPack
 from led import StatusLED
 from highscore import HighScoreManager
+from scheduler import FrameScheduler
+from replay import InputRecorder, InputReplay, SerialSink
+from splash import Splash, fast_boot_enabled, set_fast_boot
+from screens import ScreenManager
+from refresh import RefreshController
+from i2cbus import BusScheduler
+import profiler
+from memory import MemoryManager
+from power import PowerManager
+import tasks
+from tasks import InputState, TiltState
+
+# Fixed-timestep PLAYING loop: simulate at SIM_HZ, draw at most RENDER_HZ.
+# Set FIXED_TIMESTEP = False for the old variable-dt loop.
+FIXED_TIMESTEP = True
+SIM_HZ = 60
+RENDER_HZ = 25
+
+# Let the ADXL345 sample into its FIFO at ~SIM_HZ and drain it once per
+# rendered frame instead of reading the sensor on every loop pass.
+ACCEL_FIFO = True
+
+# Refresh the OLED by hand at RENDER_HZ, only when something changed,
+# instead of letting displayio auto-refresh over the shared I2C bus.
+MANUAL_REFRESH = True
+
+# Shared I2C bus clock. Tilt reads get the bus first, display refreshes
+# fill the rest of each 1/SIM_HZ frame.
+I2C_FREQUENCY = 400000
+
+# Input recording / replay of PLAYING sessions (see replay.py).
+# RECORD_INPUT: None, a file path on CIRCUITPY (needs a writable filesystem)
+#               or "serial" for hex lines on the USB console.
+# REPLAY_INPUT: None or a recorded session file to play back instead of
+#               live tilt / button input. It is refused unless it was
+#               recorded with the same FIXED_TIMESTEP and SIM_HZ.
+RECORD_INPUT = None
+REPLAY_INPUT = None
+
+# None: win after the 10 levels in levels.bin. An int keeps going after
+# them with levels generated from this seed (same seed, same levels).
+ENDLESS_SEED = None
+
+# RUNTIME = "loop": one while loop runs input, sensor, game, render and LED
+# in turn on every pass.
+# RUNTIME = "async": each of them is its own asyncio task with its own
+# period (needs lib/asyncio from the CircuitPython bundle). The game
+# task runs every 1/SIM_HZ and the render task every 1/RENDER_HZ.
+RUNTIME = "loop"
+INPUT_MS = 2     # encoder and button polling
+SENSOR_MS = 10   # get_tilt() / calibration pace their own bus reads
+LED_MS = 20      # LED effect step, in both runtimes
+
+# Stage timings, free heap and GC events (see profiler.py). Send "p" over
+# the USB console for a p50 / p95 / max summary. When a game ends it is
+# printed together with the scheduler, refresh, bus, memory, LED, power
+# and task counters; without PROFILE nothing is printed.
+# PROFILE_OVERLAY shows fps and free heap in the game.
+PROFILE = False
+PROFILE_OVERLAY = False
+
+# GC runs at level loads, screen changes and calibration (see memory.py);
+# a PLAYING frame that allocates more than this many bytes is reported.
+FRAME_ALLOC_BUDGET = 1024
+
+# Light-sleep on the menu / result / high score screens after
+# IDLE_AFTER_MS without input (see power.py). IDLE_PIN_WAKE sleeps until
+# D2/D6 go low, otherwise a timer wakes it every render frame.
+# IDLE_WAKE_ENCODER also arms D0/D1; the alarms are level triggered and
+# an encoder can rest on a detent with a contact closed, which wakes the
+# board straight away, so only use it with an encoder that rests open.
+IDLE_SLEEP = True
+IDLE_AFTER_MS = 10000
+IDLE_PIN_WAKE = True
+IDLE_WAKE_ENCODER = False
+
+# New high scores are kept in RAM and written to flash once a menu /
+# result / high score screen has gone SCORE_FLUSH_MS without input, so
+# back-to-back games share one write (see highscore.py).
+SCORE_FLUSH_MS = 5000
 
 displayio.release_displays()
-i2c = busio.I2C(board.SCL, board.SDA)
+bus = BusScheduler(board.SCL, board.SDA, frequency=I2C_FREQUENCY, frame_ms=1000 // SIM_HZ, timing=PROFILE)
+i2c = bus.i2c
 
 display_bus = i2cdisplaybus.I2CDisplayBus(i2c, device_address=0x3C)
 display = adafruit_displayio_ssd1306.SSD1306(display_bus, width=128, height=64)
 
-def show_splash():
-    for frame in range(14):
-        g = displayio.Group()
-
-        for col in range(8):
-            x = 4 + col * 16
-
-            y1 = (frame * 6 + col * 6) % 64
-            y2 = (frame * 6 + col * 6 + 24) % 64
-
-            e1 = label.Label(terminalio.FONT, text="X", x=x, y=y1)
-            e2 = label.Label(terminalio.FONT, text="X", x=x, y=y2)
-            g.append(e1)
-            g.append(e2)
-
-        display.root_group = g
-        time.sleep(0.025)
-
-    g = displayio.Group()
-    t1 = label.Label(terminalio.FONT, text="THUNDER", x=42, y=24)
-    t2 = label.Label(terminalio.FONT, text="FIGHTER", x=42, y=40)
-    g.append(t1)
-    g.append(t2)
-    display.root_group = g
-    time.sleep(3)
-
-show_splash()
+# BOOT
+# Buttons first so the splash can be skipped, then the rest of the hardware
+# is brought up between splash frames.
+def make_button(board_pin):
+    button_pin = digitalio.DigitalInOut(board_pin)
+    button_pin.direction = digitalio.Direction.INPUT
+    button_pin.pull = digitalio.Pull.UP
+    return button_pin, Debouncer(button_pin)
+
+def make_encoder():
+    return RotaryEncoder(board.D0, board.D1, debounce_ms=3)
+
+pin, btn = make_button(board.D2)
+inv_pin, inv_btn = make_button(board.D6)
+
+# Holding the invincibility button at power-up toggles fast boot
+if not inv_pin.value:
+    enabled = not fast_boot_enabled()
+    if set_fast_boot(enabled):
+        print("fast boot", "on" if enabled else "off")
+
+splash = None if fast_boot_enabled() else Splash(display)
+
+def boot_step() -> None:
+    global splash
+    if splash is None:
+        return
+    btn.update()
+    if btn.fell:
+        splash.skip()
+    if splash.step():
+        splash = None
 
 accel = Accelerometer(i2c)
-led = StatusLED()
-hs_manager = HighScoreManager()
-
-encoder = RotaryEncoder(board.D0, board.D1, debounce_ms=3, pulses_per_detent=3)
-
-pin = digitalio.DigitalInOut(board.D2)
-pin.direction = digitalio.Direction.INPUT
-pin.pull = digitalio.Pull.UP
-btn = Debouncer(pin)
-
-inv_pin = digitalio.DigitalInOut(board.D6)
-inv_pin.direction = digitalio.Direction.INPUT
-inv_pin.pull = digitalio.Pull.UP
-inv_btn = Debouncer(inv_pin)
-
+if ACCEL_FIFO:
+    accel.enable_fifo(rate_hz=SIM_HZ, poll_ms=1000 // RENDER_HZ)
+boot_step()
+led = StatusLED(frame_ms=LED_MS, timing=PROFILE)
+boot_step()
 difficulty = Difficulty()
-playing_drawn = False
-game_over_drawn = False
-win_drawn = False
-highscore_drawn = False
+hs_manager = HighScoreManager(boards=difficulty.options)
+boot_step()
+encoder = make_encoder()
+
+while splash is not None:
+    boot_step()
+    time.sleep(0.005)
+
+refresher = RefreshController(display, RENDER_HZ) if MANUAL_REFRESH else None
+prof = profiler.Profiler(damage=refresher) if PROFILE else None
+memory = MemoryManager(budget=FRAME_ALLOC_BUDGET)
+
+# A PinAlarm needs its pin to itself, so the buttons and encoder are
+# handed over for each sleep and rebuilt after it
+def release_inputs() -> None:
+    global encoder_detent
+    pin.deinit()
+    inv_pin.deinit()
+    if IDLE_WAKE_ENCODER:
+        encoder_detent = encoder.position
+        encoder.deinit()
+
+def claim_inputs() -> None:
+    global pin, btn, inv_pin, inv_btn, encoder
+    pin, btn = make_button(board.D2)
+    inv_pin, inv_btn = make_button(board.D6)
+    if IDLE_WAKE_ENCODER:
+        encoder = make_encoder()
+        encoder.reset(to_detent=encoder_detent)
+
+encoder_detent = 0
+power = None
+if IDLE_SLEEP:
+    wake_pins = (board.D2, board.D6)
+    if IDLE_WAKE_ENCODER:
+        wake_pins += (board.D0, board.D1)
+    power = PowerManager(
+        wake_pins,
+        idle_after_ms=IDLE_AFTER_MS,
+        poll_ms=1000 // RENDER_HZ,
+        release=release_inputs if IDLE_PIN_WAKE else None,
+        claim=claim_inputs if IDLE_PIN_WAKE else None,
+    )
 
 game = None
-last_time = time.monotonic()
-last_index = None
+difficulty_name = None
+last_ticks = ticks_ms()
+input_ticks = last_ticks
+scheduler = FrameScheduler(SIM_HZ, RENDER_HZ)
+# time.sleep() takes seconds; a float built every pass would allocate,
+# so the waits the loop uses are built once
+SLEEP_S = tuple(ms / 1000 for ms in range(11))
 
 led.off()
 
 last_final_score = 0
-post_game_stage = "none"   # "none", "score", "board"
+
+recorder = None
+replay = None
+calibration = None
+calibration_screen = None
+shown_restarts = 0
+
+# INPUT RECORDING
+def open_recorder(difficulty_name):
+    if RECORD_INPUT is None:
+        return None
+    try:
+        if RECORD_INPUT == "serial":
+            stream = SerialSink()
+        else:
+            stream = open(RECORD_INPUT, "wb")
+    except OSError as e:
+        print("input recording disabled:", e)
+        return None
+    return InputRecorder(stream, difficulty_name, fixed=FIXED_TIMESTEP, sim_hz=SIM_HZ)
+
+def open_replay():
+    if REPLAY_INPUT is None:
+        return None
+    try:
+        session = InputReplay(open(REPLAY_INPUT, "rb"))
+    except (OSError, ValueError) as e:
+        print("input replay disabled:", e)
+        return None
+    # Other timestep settings would replay the input into a different game
+    if session.fixed != FIXED_TIMESTEP or session.sim_hz != SIM_HZ:
+        print(
+            "input replay disabled: recorded with FIXED_TIMESTEP={} SIM_HZ={}".format(
+                session.fixed, session.sim_hz
+            )
+        )
+        session.close()
+        return None
+    return session
 
 # DRAW
-def draw_menu(selected_index: int) -> None:
-    main_group = displayio.Group()
+# Screens are built once and cached; draw_* only swap root_group and
+# update the dynamic text.
+def build_menu(screen):
     for i, name in enumerate(difficulty.options):
-        prefix = "*" if i == selected_index else " "
-        text = prefix + " " + name
         # positions from your version
-        text_layer = label.Label(terminalio.FONT, text=text, x=36, y=16 + i * 16)
-        main_group.append(text_layer)
-    display.root_group = main_group
-
-def draw_hold_still_screen() -> None:
-    main_group = displayio.Group()
-    text1 = label.Label(terminalio.FONT, text="HOLD STILL", x=32, y=24)
-    text2 = label.Label(terminalio.FONT, text="Calibrating...", x=28, y=40)
-    main_group.append(text1)
-    main_group.append(text2)
-    display.root_group = main_group
+        screen.add("  " + name, x=36, y=16 + i * 16)
 
-def draw_playing_screen() -> None:
-    main_group = displayio.Group()
-    text_layer = label.Label(terminalio.FONT, text="START!", x=48, y=30)
-    main_group.append(text_layer)
-    display.root_group = main_group
-
-def draw_game_over_screen(score: int) -> None:
-    main_group = displayio.Group()
-    text1 = label.Label(terminalio.FONT, text="GAME OVER", x=36, y=18)
-    text2 = label.Label(terminalio.FONT, text="Score: " + str(score), x=40, y=34)
-    text3 = label.Label(terminalio.FONT, text="Click for highscores", x=8, y=52)
-    main_group.append(text1)
-    main_group.append(text2)
-    main_group.append(text3)
-    display.root_group = main_group
-
-def draw_win_screen(score: int) -> None:
-    main_group = displayio.Group()
-    text1 = label.Label(terminalio.FONT, text="YOU WIN!", x=38, y=18)
-    text2 = label.Label(terminalio.FONT, text="Score: " + str(score), x=40, y=34)
-    text3 = label.Label(terminalio.FONT, text="Click for highscores", x=8, y=52)
-    main_group.append(text1)
-    main_group.append(text2)
-    main_group.append(text3)
-    display.root_group = main_group
+def build_hold_still(screen):
+    screen.add("HOLD STILL", x=32, y=24)
+    screen.add("Calibrating...", x=28, y=40)
 
-def draw_highscore_screen(scores, last_score: int) -> None:
-    main_group = displayio.Group()
+def build_playing(screen):
+    screen.add("START!", x=48, y=30)
 
-    your_label = label.Label(
-        terminalio.FONT,
-        text="Your score: " + str(last_score),
-        x=32,
-        y=12,
-    )
-    main_group.append(your_label)
+def build_result(screen, title: str, x: int):
+    screen.add(title, x=x, y=18)
+    screen.add("Score: 0", x=40, y=34)
+    screen.add("Click for highscores", x=8, y=52)
 
+def build_highscores(screen):
+    screen.add("Your score: 0", x=32, y=12)
     y = 30
-    for i, sc in enumerate(scores, start=1):
-        line = "{}: {}".format(i, sc)
-        lbl = label.Label(terminalio.FONT, text=line, x=54, y=y)
-        main_group.append(lbl)
+    for _ in hs_manager.get_scores():
+        screen.add("", x=54, y=y)
         y += 12
 
-    display.root_group = main_group
+screens = ScreenManager(display, damage=refresher, memory=memory)
+screens.register("menu", build_menu)
+screens.register("hold_still", build_hold_still)
+screens.register("playing", build_playing)
+screens.register("game_over", lambda screen: build_result(screen, "GAME OVER", 36))
+screens.register("win", lambda screen: build_result(screen, "YOU WIN!", 38))
+screens.register("highscores", build_highscores)
 
-# MAIN LOOP
+def draw_menu(selected_index: int) -> None:
+    screen = screens.show("menu")
+    for i, name in enumerate(difficulty.options):
+        prefix = "*" if i == selected_index else " "
+        screen.set(i, prefix + " " + name)
 
-while True:
+def draw_hold_still_screen():
+    screen = screens.show("hold_still")
+    screen.set(1, "Calibrating...")
+    return screen
+
+def draw_playing_screen() -> None:
+    screens.show("playing")
+
+def draw_highscore_screen(scores, last_score: int) -> None:
+    screen = screens.show("highscores")
+    screen.set(0, "Your score: " + str(last_score))
+    for i in range(1, len(screen.labels)):
+        if i <= len(scores):
+            screen.set(i, "{}: {}".format(i, scores[i - 1]))
+        else:
+            screen.set(i, "")
+
+# RUNTIME
+# The main loop is split per subsystem. poll_input, sample_sensor,
+# step_game, render and update_led share data only through the state
+# objects below, so they can run in one loop pass or as separate tasks.
+inputs = InputState()
+tilt = TiltState()
+draw_pending = False
+led_invincible = False
+
+LED_COLORS = {
+    Difficulty.STATE_MENU: (0, 0, 40),          # blue
+    Difficulty.STATE_CALIBRATING: (40, 40, 0),  # yellow
+    Difficulty.STATE_PLAYING: (0, 40, 0),       # green
+    Difficulty.STATE_GAME_OVER: (40, 0, 0),     # red
+    Difficulty.STATE_WIN: (30, 0, 30),          # purple
+}
+LED_FLASH = (40, 40, 40)  # white, invincibility ran out
+
+# Idle time after which the PLAYING green fades out towards Game Over
+LED_IDLE_FADE_MS = 1000
+
+def poll_input() -> None:
+    global input_ticks
+    if prof is not None:
+        start = prof.start()
     btn.update()
     inv_btn.update()
-
-    # MENU
+    if btn.fell:
+        inputs.confirm = True
+    if inv_btn.fell:
+        inputs.invincible = True
+    if prof is not None:
+        prof.stop(profiler.BUTTONS, start)
+
+    # The encoder only moves the menu cursor
     if difficulty.state == Difficulty.STATE_MENU:
-        playing_drawn = False
-        game_over_drawn = False
-        win_drawn = False
-        highscore_drawn = False
-        post_game_stage = "none"
-
-        led.set((0, 0, 40))   # blue
-
-        changed = encoder.update()
-        if changed:
-            index = encoder.position % len(difficulty.options)
-            difficulty.set_index(index)
-
-        if difficulty.selected_index != last_index:
-            draw_menu(difficulty.selected_index)
-            last_index = difficulty.selected_index
-
-        if btn.fell:
-            difficulty.confirm()
-
-    # CALIBRATING
-    elif difficulty.state == Difficulty.STATE_CALIBRATING:
-        led.set((40, 40, 0))  # yellow
-        draw_hold_still_screen()
-
-        accel.calibrate()
-
-        game = ThunderFighterGame(display, difficulty.value)
-        game.reset(difficulty.value)
-
-        last_time = time.monotonic()
+        if prof is not None:
+            start = prof.start()
+        if encoder.update():
+            inputs.turned = True
+        if prof is not None:
+            prof.stop(profiler.ENCODER, start)
+
+    if inputs.confirm or inputs.invincible or inputs.turned:
+        input_ticks = ticks_ms()
+        if power is not None:
+            power.activity()
+
+def sample_sensor() -> None:
+    if difficulty.state == Difficulty.STATE_PLAYING:
+        if prof is not None:
+            start = prof.start()
+        tilt.dx, tilt.dy = bus.sensor(accel.get_tilt_fp)
+        if prof is not None:
+            prof.stop(profiler.TILT, start)
+    elif calibration is not None and not calibration.done:
+        bus.sensor(calibration.step)
+
+def end_game(status: str) -> None:
+    # Leaving PLAYING runs exit_playing, which records the score
+    if status == "game_over":
+        difficulty.game_over()
+    else:
+        difficulty.win()
+
+# STATE HANDLERS
+# Registered on difficulty below. enter_* draw a state's screen once,
+# tick_* run every pass while in that state, exit_* clean up.
+def enter_menu() -> None:
+    draw_menu(difficulty.selected_index)
+
+def menu_turned() -> None:
+    index = encoder.position % len(difficulty.options)
+    if index != difficulty.selected_index:
+        difficulty.set_index(index)
+        draw_menu(difficulty.selected_index)
+
+def flush_scores() -> None:
+    # Only once the player has stopped pressing through screens
+    if hs_manager.pending() and ticks_diff(ticks_ms(), input_ticks) >= SCORE_FLUSH_MS:
+        hs_manager.flush()
+
+def enter_calibrating() -> None:
+    global calibration, calibration_screen, shown_restarts
+    global difficulty_name, game, replay
+
+    # Calibration is stepped by sample_sensor so nothing else waits on it
+    calibration_screen = draw_hold_still_screen()
+    calibration = accel.begin_calibration()
+    shown_restarts = 0
+
+    difficulty_name = difficulty.value
+    replay = open_replay()
+    if replay is not None and replay.difficulty:
+        difficulty_name = replay.difficulty
+
+    # The game and its scene are built once and reused
+    if game is None:
+        game = ThunderFighterGame(
+            display,
+            difficulty_name,
+            damage=refresher,
+            levels=LevelPack(endless_seed=ENDLESS_SEED),
+            memory=memory,
+        )
+        if prof is not None and PROFILE_OVERLAY:
+            game.group.append(prof.overlay())
+    # reset() loads level 1, which also collects what setup left behind
+    game.reset(difficulty_name)
+
+def tick_calibrating() -> None:
+    global shown_restarts
+
+    if calibration.done:
         difficulty.start_playing()
-
-    # PLAYING
-    elif difficulty.state == Difficulty.STATE_PLAYING:
-        if not playing_drawn:
-            draw_playing_screen()
-            playing_drawn = True
-            game_over_drawn = False
-            win_drawn = False
-            highscore_drawn = False
-            led.set((0, 40, 0))  # green
-
-        now = time.monotonic()
-        dt = now - last_time
-        last_time = now
-
-        dx, dy = accel.get_tilt()
-        invincible_pressed = inv_btn.fell
-
-        if game is not None:
-            game.handle_input(dx, dy, invincible_pressed)
-            status = game.update(dt)
+    elif calibration.restarts != shown_restarts:
+        calibration_screen.set(1, "Keep it still!")
+        shown_restarts = calibration.restarts
+
+def exit_calibrating() -> None:
+    global calibration, calibration_screen
+
+    if prof is not None:
+        print(
+            "calibrated in {} ms, {} samples, {} restarts{}".format(
+                calibration.elapsed_ms,
+                calibration.count,
+                calibration.restarts,
+                "" if calibration.stable else " (timed out)",
+            )
+        )
+    calibration = None
+    calibration_screen = None
+
+def enter_playing() -> None:
+    global recorder, last_ticks
+
+    draw_playing_screen()
+    recorder = open_recorder(difficulty_name)
+
+    last_ticks = ticks_ms()
+    scheduler.reset()
+    memory.begin_play()
+
+def tick_playing() -> None:
+    global last_ticks, replay, draw_pending
+
+    dx = tilt.dx
+    dy = tilt.dy
+    invincible_pressed = inputs.invincible
+
+    # Integer ms in both modes, no float math per frame
+    now_ticks = ticks_ms()
+    dt_ms = ticks_diff(now_ticks, last_ticks)
+    last_ticks = now_ticks
+
+    if replay is not None:
+        frame_input = replay.next()
+        if frame_input is None:
+            print("input replay finished after", replay.frames, "frames")
+            replay.close()
+            replay = None
+        else:
+            dt_ms, dx, dy, invincible_pressed, _ = frame_input
+
+    if recorder is not None:
+        recorder.record(dt_ms, dx, dy, invincible_pressed, inputs.confirm)
+
+    game.handle_input_fp(dx, dy, invincible_pressed)
+
+    if FIXED_TIMESTEP:
+        steps = scheduler.advance(dt_ms)
+
+        status = "running"
+        for _ in range(steps):
+            if prof is not None:
+                start = prof.start()
+            status = game.update_ms(scheduler.next_step_ms())
+            if prof is not None:
+                prof.stop(profiler.UPDATE, start)
+            if status != "running":
+                break
+
+        if scheduler.render_due():
+            draw_pending = True
+    else:
+        if prof is not None:
+            start = prof.start()
+        status = game.update_ms(dt_ms)
+        if prof is not None:
+            prof.stop(profiler.UPDATE, start)
+        draw_pending = True
+
+    if status != "running":
+        draw_pending = False
+        end_game(status)
+
+def print_summaries() -> None:
+    if FIXED_TIMESTEP:
+        print("frame scheduler:", scheduler.summary())
+    if refresher is not None:
+        print("display refresh:", refresher.summary())
+    print("i2c bus:", bus.summary())
+    print("memory:", memory.summary())
+    print("status led:", led.summary())
+    if power is not None:
+        print("power:", power.summary())
+    for task in runtime_tasks:
+        print("task", task.summary())
+    print(prof.summary())
+
+def exit_playing() -> None:
+    global recorder, replay, last_final_score
+
+    memory.end_play()
+    if prof is not None:
+        print_summaries()
+    if recorder is not None:
+        print("input recorded:", recorder.frames, "frames")
+        recorder.close()
+        recorder = None
+    if replay is not None:
+        replay.close()
+        replay = None
+
+    last_final_score = game.score
+    hs_manager.add_score(last_final_score, difficulty_name)
+
+def enter_result() -> None:
+    global input_ticks
+    # GAME_OVER and WIN differ only in their title
+    name = "win" if difficulty.state == Difficulty.STATE_WIN else "game_over"
+    screens.show(name).set(1, "Score: " + str(last_final_score))
+    if power is not None:
+        # The fixed-timestep loop never reaches idle_sleep() during a game,
+        # so the idle countdown starts here
+        power.activity()
+    input_ticks = ticks_ms()
+
+def enter_highscores() -> None:
+    draw_highscore_screen(hs_manager.get_scores(difficulty_name), last_final_score)
+
+difficulty.on(Difficulty.STATE_MENU, enter=enter_menu, tick=flush_scores)
+difficulty.on(
+    Difficulty.STATE_CALIBRATING,
+    enter=enter_calibrating,
+    exit=exit_calibrating,
+    tick=tick_calibrating,
+)
+difficulty.on(Difficulty.STATE_PLAYING, enter=enter_playing, exit=exit_playing, tick=tick_playing)
+difficulty.on(Difficulty.STATE_GAME_OVER, enter=enter_result, tick=flush_scores)
+difficulty.on(Difficulty.STATE_WIN, enter=enter_result, tick=flush_scores)
+difficulty.on(Difficulty.STATE_HIGHSCORES, enter=enter_highscores, tick=flush_scores)
+
+def step_game() -> None:
+    # Per-pass work first, so a state entered by an event below is drawn
+    # this pass and ticked from the next one
+    difficulty.tick()
+
+    if inputs.turned and difficulty.state == Difficulty.STATE_MENU:
+        menu_turned()
+    if inputs.confirm:
+        difficulty.confirm()
+
+    # Every edge is handled (or ignored) by the state it arrived in
+    inputs.clear()
+
+def render() -> None:
+    global draw_pending
+
+    if draw_pending:
+        draw_pending = False
+        if difficulty.state == Difficulty.STATE_PLAYING:
+            if prof is not None:
+                start = prof.start()
             game.draw()
-
-            if status == "game_over":
-                last_final_score = game.score
-                hs_manager.add_score(last_final_score)
-                post_game_stage = "score"
-                difficulty.game_over()
-
-            elif status == "win":
-                last_final_score = game.score
-                hs_manager.add_score(last_final_score)
-                post_game_stage = "score"
-                difficulty.win()
-
-    # GAME OVER
-    elif difficulty.state == Difficulty.STATE_GAME_OVER:
-        led.set((40, 0, 0))  # red
-
-        if post_game_stage == "score":
-            if not game_over_drawn:
-                draw_game_over_screen(last_final_score)
-                game_over_drawn = True
-                highscore_drawn = False
-            if btn.fell:
-                post_game_stage = "board"
-                scores = hs_manager.get_scores()
-                draw_highscore_screen(scores, last_final_score)
-                highscore_drawn = True
-
-        elif post_game_stage == "board":
-            if not highscore_drawn:
-                scores = hs_manager.get_scores()
-                draw_highscore_screen(scores, last_final_score)
-                highscore_drawn = True
-
-            if btn.fell:
-                difficulty.restart()
-                game = None
-                post_game_stage = "none"
-                last_index = None
-
-    # WIN
-    elif difficulty.state == Difficulty.STATE_WIN:
-        led.set((30, 0, 30))  # purple
-
-        if post_game_stage == "score":
-            if not win_drawn:
-                draw_win_screen(last_final_score)
-                win_drawn = True
-                highscore_drawn = False
-            if btn.fell:
-                post_game_stage = "board"
-                scores = hs_manager.get_scores()
-                draw_highscore_screen(scores, last_final_score)
-                highscore_drawn = True
-
-        elif post_game_stage == "board":
-            if not highscore_drawn:
-                scores = hs_manager.get_scores()
-                draw_highscore_screen(scores, last_final_score)
-                highscore_drawn = True
-
-            if btn.fell:
-                difficulty.restart()
-                game = None
-                post_game_stage = "none"
-                last_index = None
-
-    time.sleep(0.001)
\ No newline at end of file
+            if prof is not None:
+                prof.stop(profiler.DRAW, start)
+                prof.frame()
+
+    if refresher is not None:
+        if prof is not None:
+            start = prof.start()
+        if bus.display(refresher.flush) and prof is not None:
+            prof.stop(profiler.FLUSH, start)
+
+def profile_tick() -> None:
+    prof.sample()
+    prof.poll_serial()
+
+def update_led() -> None:
+    global led_invincible
+
+    # The effect calls only start something when it is not already running
+    state = difficulty.state
+    if state == Difficulty.STATE_HIGHSCORES:
+        # The board keeps the colour of the result that led to it
+        state = difficulty.previous
+    color = LED_COLORS[state]
+    if state == Difficulty.STATE_PLAYING and game is not None:
+        if game.idle_ms >= LED_IDLE_FADE_MS:
+            led.fade(color, IDLE_TIMEOUT_MS - game.idle_ms)
+        else:
+            led.set(color)
+        if led_invincible and not game.invincible:
+            led.flash(LED_FLASH)
+        led_invincible = game.invincible
+    elif power is not None and power.sleeping:
+        # A pulse would only advance between sleeps and stutter; hold it
+        led.set(color)
+    elif state == Difficulty.STATE_MENU or state == Difficulty.STATE_WIN:
+        led.pulse(color)
+    elif state == Difficulty.STATE_CALIBRATING:
+        led.blink(color)
+    else:
+        led.set(color)
+    led.tick()
+
+def idle_sleep() -> bool:
+    """Light-sleep on idle screens. Returns True if it slept."""
+    if power is None:
+        return False
+    state = difficulty.state
+    if state == Difficulty.STATE_PLAYING or state == Difficulty.STATE_CALIBRATING:
+        return False
+    if not power.idle():
+        return False
+
+    # The inputs were rebuilt after a pin wake and missed the press
+    woke = power.wake_pin
+    if woke == board.D2:
+        inputs.confirm = True
+    elif woke == board.D6:
+        inputs.invincible = True
+    elif woke is None and (not pin.value or not inv_pin.value):
+        # Timer wake with a button down: poll at full rate to catch it
+        power.activity()
+    return True
+
+def run_loop() -> None:
+    while True:
+        pass_ticks = ticks_ms()
+        if difficulty.state == Difficulty.STATE_PLAYING:
+            memory.frame_start()
+        bus.begin_frame()
+        poll_input()
+        sample_sensor()
+        step_game()
+        render()
+        memory.frame_end()
+        update_led()
+        if prof is not None:
+            profile_tick()
+
+        if FIXED_TIMESTEP and difficulty.state == Difficulty.STATE_PLAYING:
+            scheduler.end_frame(ticks_diff(ticks_ms(), pass_ticks))
+            # Nothing to simulate until the next tick is due
+            wait = scheduler.idle_ms()
+            if wait > 0:
+                time.sleep(SLEEP_S[min(wait, 10)])
+        elif not idle_sleep():
+            time.sleep(0.001)
+
+def game_task() -> None:
+    task_ticks = ticks_ms()
+    if difficulty.state == Difficulty.STATE_PLAYING:
+        memory.frame_start()
+    step_game()
+    memory.frame_end()
+    if FIXED_TIMESTEP and difficulty.state == Difficulty.STATE_PLAYING:
+        scheduler.end_frame(ticks_diff(ticks_ms(), task_ticks))
+
+def render_task() -> None:
+    # Sensor reads have their own task, so each render starts a fresh bus frame
+    bus.begin_frame()
+    render()
+
+difficulty.begin()
+
+runtime_tasks = []
+if RUNTIME == "async" and not tasks.available():
+    print("asyncio not installed, using the loop runtime")
+    RUNTIME = "loop"
+
+if RUNTIME == "async":
+    runtime_tasks = [
+        tasks.PeriodicTask("input", poll_input, INPUT_MS, timing=PROFILE),
+        tasks.PeriodicTask("sensor", sample_sensor, SENSOR_MS, timing=PROFILE),
+        tasks.PeriodicTask("game", game_task, 1000 // SIM_HZ, timing=PROFILE),
+        tasks.PeriodicTask("render", render_task, 1000 // RENDER_HZ, timing=PROFILE),
+        tasks.PeriodicTask("led", update_led, LED_MS, timing=PROFILE),
+    ]
+    if power is not None:
+        # Sleeps block every task, which is the point on an idle screen
+        runtime_tasks.append(tasks.PeriodicTask("power", idle_sleep, INPUT_MS, timing=PROFILE))
+    if prof is not None:
+        runtime_tasks.append(tasks.PeriodicTask("profiler", profile_tick, 1000 // SIM_HZ, timing=PROFILE))
+    tasks.run(runtime_tasks)
+else:
+    run_loop()
@@ -1,12 +1,22 @@
 """
 difficulty.py
 
-Difficulty + basic game states:
+Difficulty + game state machine:
 - STATE_MENU         : choosing difficulty
 - STATE_CALIBRATING  : accelerometer calibration
 - STATE_PLAYING      : game running
-- STATE_GAME_OVER    : game ended, can restart
-- STATE_WIN          : finished all levels successfully
+- STATE_GAME_OVER    : game ended, shows the score
+- STATE_WIN          : finished all levels successfully, shows the score
+- STATE_HIGHSCORES   : high score board after a game, then back to menu
+
+The state only changes through dispatch(event), looked up in
+TRANSITIONS. code.py registers enter / exit / tick handlers per state
+with on(): enter draws a screen once, exit cleans up, and tick is the
+per-pass work of states that have any. A state without a tick handler
+costs nothing until an event arrives.
+
+confirm(), start_playing(), game_over(), win() and restart() are kept
+as wrappers that dispatch the matching event.
 """
 
 class Difficulty:
@@ -15,38 +25,104 @@ class Difficulty:
     STATE_PLAYING = 2
     STATE_GAME_OVER = 3
     STATE_WIN = 4
+    STATE_HIGHSCORES = 5
+
+    EVENT_CONFIRM = 0
+    EVENT_CALIBRATED = 1
+    EVENT_GAME_OVER = 2
+    EVENT_WIN = 3
+    EVENT_RESTART = 4
+
+    # Per state (by index): event -> next state. Events missing from a
+    # state's entry are ignored in that state.
+    TRANSITIONS = (
+        # MENU
+        {EVENT_CONFIRM: STATE_CALIBRATING},
+        # CALIBRATING
+        {EVENT_CALIBRATED: STATE_PLAYING},
+        # PLAYING
+        {EVENT_GAME_OVER: STATE_GAME_OVER, EVENT_WIN: STATE_WIN},
+        # GAME_OVER
+        {EVENT_CONFIRM: STATE_HIGHSCORES, EVENT_RESTART: STATE_MENU},
+        # WIN
+        {EVENT_CONFIRM: STATE_HIGHSCORES, EVENT_RESTART: STATE_MENU},
+        # HIGHSCORES
+        {EVENT_CONFIRM: STATE_MENU, EVENT_RESTART: STATE_MENU},
+    )
 
     def __init__(self):
         self.options = ["EASY", "MEDIUM", "HARD"]
         self.selected_index = 0
         self.state = Difficulty.STATE_MENU
+        self.previous = None
         self.value = None
 
+        count = len(Difficulty.TRANSITIONS)
+        self._enter = [None] * count
+        self._exit = [None] * count
+        self._tick = [None] * count
+
+        self.transitions = 0
+
     def selected(self):
         return self.options[self.selected_index]
 
     def set_index(self, index: int) -> None:
         self.selected_index = index % len(self.options)
 
-    def confirm(self) -> None:
+    def on(self, state: int, enter=None, exit=None, tick=None) -> None:
+        """Register handlers for a state; each is called with no arguments."""
+        self._enter[state] = enter
+        self._exit[state] = exit
+        self._tick[state] = tick
+
+    def begin(self) -> None:
+        """Run the enter handler of the starting state."""
+        handler = self._enter[self.state]
+        if handler is not None:
+            handler()
+
+    def tick(self) -> None:
+        handler = self._tick[self.state]
+        if handler is not None:
+            handler()
+
+    def dispatch(self, event: int) -> bool:
+        """Apply event to the current state. Returns True if the state changed."""
+        new_state = Difficulty.TRANSITIONS[self.state].get(event)
+        if new_state is None:
+            return False
+
+        handler = self._exit[self.state]
+        if handler is not None:
+            handler()
+
         if self.state == Difficulty.STATE_MENU:
-            self.value = self.selected
-            self.state = Difficulty.STATE_CALIBRATING
+            self.value = self.selected()
+        if new_state == Difficulty.STATE_MENU:
+            self.selected_index = 0
+            self.value = None
+
+        self.previous = self.state
+        self.state = new_state
+        self.transitions += 1
+
+        handler = self._enter[new_state]
+        if handler is not None:
+            handler()
+        return True
+
+    def confirm(self) -> None:
+        self.dispatch(Difficulty.EVENT_CONFIRM)
 
     def start_playing(self) -> None:
-        if self.state == Difficulty.STATE_CALIBRATING:
-            self.state = Difficulty.STATE_PLAYING
+        self.dispatch(Difficulty.EVENT_CALIBRATED)
 
     def game_over(self) -> None:
-        if self.state == Difficulty.STATE_PLAYING:
-            self.state = Difficulty.STATE_GAME_OVER
+        self.dispatch(Difficulty.EVENT_GAME_OVER)
 
     def win(self) -> None:
-        if self.state == Difficulty.STATE_PLAYING:
-            self.state = Difficulty.STATE_WIN
+        self.dispatch(Difficulty.EVENT_WIN)
 
     def restart(self) -> None:
-        if self.state in (Difficulty.STATE_GAME_OVER, Difficulty.STATE_WIN):
-            self.state = Difficulty.STATE_MENU
-            self.selected_index = 0
-            self.value = None
\ No newline at end of file
+        self.dispatch(Difficulty.EVENT_RESTART)
@@ -2,30 +2,188 @@
 highscore.py
 
 High score manager for Thunder Fighter.
-Stores top 3 scores in internal flash.
+Keeps a top-N board per difficulty in internal flash.
+
+Storage is an append-only log of small checksummed records, one per score
+that made a board:
+- add_score() only updates the boards in RAM and queues the record; the
+  flash write happens in flush(), which code.py calls once a screen has
+  sat idle, so scores from several quick games share one write
+- a flush appends a few bytes instead of rewriting the whole file
+- once the log holds more than max_records records it is compacted: the
+  current boards are written to a temp file, which then replaces the log
+
+A record torn by power loss fails its checksum and is skipped on load
+(the next compaction drops it). If power is lost while compacting,
+either the old log or the complete temp file is still there.
+
+Scores from the old highscores.txt are imported into the first board.
 """
 
-DEFAULT_FILE = "highscores.txt"
+import os
+import struct
+
+DEFAULT_FILE = "highscores.log"
+LEGACY_FILE = "highscores.txt"
+
+# tag, board index, score, checksum
+RECORD = "<BBHB"
+RECORD_SIZE = struct.calcsize(RECORD)
+RECORD_TAG = 0x5C
+
+
+def _checksum(board: int, score: int) -> int:
+    return ((RECORD_TAG + board + (score & 0xFF) + (score >> 8)) & 0xFF) ^ 0xFF
+
 
 class HighScoreManager:
-    def __init__(self, filename: str = DEFAULT_FILE, size: int = 3):
+    def __init__(self, filename: str = DEFAULT_FILE, size: int = 3, boards=("DEFAULT",), max_records: int = 64):
+        """
+        filename: record log on CIRCUITPY
+        size: scores kept per board
+        boards: board names, e.g. Difficulty.options
+        max_records: log length that triggers a compaction
+        """
         self._filename = filename
+        self._tmp_filename = filename + ".tmp"
         self._size = size
-        self._scores = self._load()
+        self._names = list(boards)
+        self._boards = [[0] * size for _ in self._names]
+        # Room to append at least one full set of boards between compactions
+        self._max_records = max(max_records, 2 * size * len(self._names))
+
+        self._pending = []
+        self._records = 0
+        self._needs_compact = False
+        self.writable = True
 
-    def add_score(self, score: int) -> None:
-        self._scores.append(int(score))
-        self._scores.sort(reverse=True)
-        self._scores = self._scores[: self._size]
-        self._save()
+        self.appends = 0
+        self.compactions = 0
+        self.skipped_bytes = 0
 
-    def get_scores(self):
-        return list(self._scores)
+        self._load()
 
-    def _load(self):
+    def _board(self, name) -> int:
+        if name is None:
+            return 0
         try:
-            scores = []
-            with open(self._filename, "r") as f:
+            return self._names.index(name)
+        except ValueError:
+            return 0
+
+    def _insert(self, board: int, score: int) -> bool:
+        """Insert into a board in place. Returns False if it did not place."""
+        scores = self._boards[board]
+        i = len(scores)
+        while i > 0 and scores[i - 1] < score:
+            i -= 1
+        if i >= len(scores):
+            return False
+        scores.insert(i, score)
+        scores.pop()
+        return True
+
+    def add_score(self, score: int, board=None) -> None:
+        """Add score to the named board (default: the first). Not written until flush()."""
+        score = max(0, min(0xFFFF, int(score)))
+        index = self._board(board)
+        if self._insert(index, score):
+            self._pending.append((index, score))
+
+    def get_scores(self, board=None):
+        return list(self._boards[self._board(board)])
+
+    def pending(self) -> bool:
+        return bool(self._pending) or self._needs_compact
+
+    def flush(self) -> bool:
+        """Write queued scores. Returns False if the filesystem is read-only."""
+        if not self.pending() or not self.writable:
+            return self.writable
+        try:
+            if self._needs_compact or self._records + len(self._pending) > self._max_records:
+                self._compact()
+            else:
+                self._append()
+        except OSError as e:
+            # CIRCUITPY is read-only unless boot.py remounts it; keep RAM boards
+            print("high scores not saved:", e)
+            self.writable = False
+            return False
+        self._pending = []
+        return True
+
+    def _append(self) -> None:
+        data = bytearray(RECORD_SIZE * len(self._pending))
+        offset = 0
+        for board, score in self._pending:
+            struct.pack_into(RECORD, data, offset, RECORD_TAG, board, score, _checksum(board, score))
+            offset += RECORD_SIZE
+        with open(self._filename, "ab") as f:
+            f.write(data)
+        self._records += len(self._pending)
+        self.appends += 1
+        _sync()
+
+    def _compact(self) -> None:
+        count = 0
+        with open(self._tmp_filename, "wb") as f:
+            for board in range(len(self._boards)):
+                for score in self._boards[board]:
+                    if score:
+                        f.write(struct.pack(RECORD, RECORD_TAG, board, score, _checksum(board, score)))
+                        count += 1
+        _sync()
+        _remove(self._filename)
+        os.rename(self._tmp_filename, self._filename)
+        _sync()
+        self._records = count
+        self._needs_compact = False
+        self.compactions += 1
+
+    def _read(self, filename: str) -> bool:
+        try:
+            with open(filename, "rb") as f:
+                data = f.read()
+        except OSError:
+            return False
+
+        offset = 0
+        end = len(data) - RECORD_SIZE
+        while offset <= end:
+            tag, board, score, check = struct.unpack_from(RECORD, data, offset)
+            if tag != RECORD_TAG or board >= len(self._boards) or check != _checksum(board, score):
+                # Torn or corrupt: resync on the next byte
+                offset += 1
+                self.skipped_bytes += 1
+                continue
+            self._insert(board, score)
+            self._records += 1
+            offset += RECORD_SIZE
+        self.skipped_bytes += len(data) - offset
+        if self.skipped_bytes:
+            self._needs_compact = True
+        return True
+
+    def _load(self) -> None:
+        if self._read(self._filename):
+            # A leftover temp file is from an interrupted compaction
+            _remove(self._tmp_filename)
+            return
+
+        # Power was lost between removing the log and renaming the temp file
+        if self._read(self._tmp_filename):
+            self._needs_compact = True
+            return
+
+        for score in self._read_legacy():
+            if self._insert(0, score):
+                self._needs_compact = True
+
+    def _read_legacy(self):
+        scores = []
+        try:
+            with open(LEGACY_FILE, "r") as f:
                 for line in f:
                     line = line.strip()
                     if not line:
@@ -34,20 +192,19 @@ class HighScoreManager:
                         scores.append(int(line))
                     except ValueError:
                         pass
-
-            if not scores:
-                scores = []
         except OSError:
-            scores = []
+            pass
+        return scores
 
-        while len(scores) < self._size:
-            scores.append(0)
 
-        scores.sort(reverse=True)
-        return scores[: self._size]
+def _remove(filename: str) -> None:
+    try:
+        os.remove(filename)
+    except OSError:
+        pass
 
-    def _save(self):
-        with open(self._filename, "w") as f:
-            for s in self._scores:
-                f.write(str(int(s)) + "\n")
 
+def _sync() -> None:
+    sync = getattr(os, "sync", None)
+    if sync is not None:
+        sync()
@@ -0,0 +1,105 @@
+"""
+i2cbus.py
+
+Shared I2C bus scheduler for the SSD1306 and the ADXL345.
+
+BusScheduler owns the busio.I2C object and every transfer goes through
+it, so bus use can be ordered and measured:
+- sensor() runs immediately: tilt reads always have priority
+- display() runs in the time left over in the current frame; if the
+  estimated transfer would overrun the frame budget it is deferred, at
+  most max_defer frames in a row so the screen cannot starve
+- per-client calls are counted by a profiler.CallTimer; with timing on
+  it also keeps bus time and the worst transfer, which for the display
+  bounds how late a tilt read can be. The display estimate itself is
+  kept in ticks_ms
+
+The bus clock is set at construction. The ADXL345 is specified up to
+400 kHz, so that is the highest clock both devices are guaranteed to
+handle.
+"""
+
+import busio
+from adafruit_ticks import ticks_ms, ticks_diff
+
+from profiler import CallTimer
+
+SENSOR = 0
+DISPLAY = 1
+CLIENT_NAMES = ("sensor", "display")
+
+
+class BusScheduler:
+    def __init__(
+        self,
+        scl,
+        sda,
+        *,
+        frequency: int = 400000,
+        frame_ms: int = 16,
+        max_defer: int = 3,
+        timing: bool = False,
+    ):
+        """
+        scl, sda: bus pins
+        frequency: I2C clock in Hz
+        frame_ms: frame budget display transfers have to fit into
+        max_defer: display transfers deferred in a row before one is forced
+        timing: also measure every transfer in microseconds, see CallTimer
+        """
+        self.i2c = busio.I2C(scl, sda, frequency=frequency)
+        self.frequency = frequency
+        self.frame_ms = frame_ms
+        self.max_defer = max_defer
+
+        self._frame_start = ticks_ms()
+        self._deferred = 0
+        # Running estimate of one display transfer, in ms
+        self._display_cost = 0
+
+        self.timers = (CallTimer(timing), CallTimer(timing))
+        self.deferrals = 0
+
+    def begin_frame(self) -> None:
+        self._frame_start = ticks_ms()
+
+    def sensor(self, fn, *args):
+        """Run a sensor transfer now. Returns fn's result."""
+        timer = self.timers[SENSOR]
+        start = timer.start()
+        result = fn(*args)
+        timer.stop(start)
+        return result
+
+    def display(self, fn, *args) -> bool:
+        """
+        Run a display transfer if it fits in what is left of the frame.
+        fn should return True when it actually sent something; calls that
+        sent nothing are not counted as bus time.
+        Returns False if the transfer was deferred or sent nothing.
+        """
+        used = ticks_diff(ticks_ms(), self._frame_start)
+        if used + self._display_cost > self.frame_ms and self._deferred < self.max_defer:
+            self._deferred += 1
+            self.deferrals += 1
+            return False
+
+        timer = self.timers[DISPLAY]
+        start = ticks_ms()
+        start_timer = timer.start()
+        sent = fn(*args)
+        if sent:
+            timer.stop(start_timer)
+            self._deferred = 0
+            # Half old estimate, half this transfer counted as a started
+            # ms, rounded up
+            spent_ms = ticks_diff(ticks_ms(), start) + 1
+            self._display_cost = (self._display_cost + spent_ms + 1) // 2
+        return bool(sent)
+
+    def summary(self) -> str:
+        parts = ["{} kHz".format(self.frequency // 1000)]
+        for client in (SENSOR, DISPLAY):
+            parts.append("{}: {}".format(CLIENT_NAMES[client], self.timers[client].summary()))
+        parts.append("display est {} ms, deferred {}".format(self._display_cost, self.deferrals))
+        return "; ".join(parts)
@@ -2,17 +2,151 @@
 led.py
 
 Helper class for the single NeoPixel status LED.
+
+The NeoPixel write is bit-banged with interrupts off, so StatusLED only
+sends a colour when it differs from the one already showing. set() and
+off() show a colour straight away; pulse(), blink() and fade() start an
+effect and flash() lays a short flash over whatever is running. Effects
+are worked out from ticks_ms in tick(), which code.py calls every pass:
+it returns at once unless frame_ms has passed, so an effect costs at
+most one colour computation and one write per frame_ms. Calling an
+effect that is already running does not restart it.
+
+summary() reports skipped (unchanged) colours and the writes, timed by a
+profiler.CallTimer when timing is on.
 """
 import board
 import neopixel
+from adafruit_ticks import ticks_ms, ticks_add, ticks_diff
+
+from profiler import CallTimer
+
+SOLID = 0
+PULSE = 1
+BLINK = 2
+FADE = 3
 
 
 class StatusLED:
-    def __init__(self, pin=board.D7, brightness=0.3):
-        self._pixels = neopixel.NeoPixel(pin, 1, brightness=brightness, auto_write=True)
+    def __init__(self, pin=board.D7, brightness=0.3, frame_ms: int = 20, timing: bool = False):
+        """
+        frame_ms: least time between two effect updates
+        timing: measure each write in microseconds, see CallTimer
+        """
+        self._pixels = neopixel.NeoPixel(pin, 1, brightness=brightness, auto_write=False)
+        self._frame_ms = frame_ms
+        self._last_tick = ticks_ms()
+
+        # Colour on the pixel, -1 until the first write
+        self._r = -1
+        self._g = -1
+        self._b = -1
+
+        self._effect = SOLID
+        self._color = (0, 0, 0)
+        self._start = 0
+        self._on_ms = 0
+        self._off_ms = 0
+
+        self._flash = None
+        self._flash_end = 0
+
+        self.write_timer = CallTimer(timing)
+        self.skipped = 0
+        self.ticks = 0
 
     def set(self, color):
-        self._pixels[0] = color
+        """Show a steady colour; a running flash still finishes."""
+        self._effect = SOLID
+        self._color = color
+        if self._flash is None:
+            self._show(color[0], color[1], color[2])
 
     def off(self):
-        self._pixels[0] = (0, 0, 0)
\ No newline at end of file
+        self.set((0, 0, 0))
+
+    def pulse(self, color, period_ms: int = 2000):
+        """Fade color up and down once per period_ms."""
+        if self._effect == PULSE and self._color == color and self._on_ms == period_ms:
+            return
+        self._begin(PULSE, color, period_ms, 0)
+
+    def blink(self, color, on_ms: int = 250, off_ms: int = 250):
+        if self._effect == BLINK and self._color == color and self._on_ms == on_ms and self._off_ms == off_ms:
+            return
+        self._begin(BLINK, color, on_ms, off_ms)
+
+    def fade(self, color, duration_ms: int):
+        """Fade color out to off over duration_ms."""
+        if self._effect == FADE and self._color == color:
+            return
+        self._begin(FADE, color, max(1, duration_ms), 0)
+
+    def flash(self, color, duration_ms: int = 150):
+        """Show color for duration_ms, then go back to the running effect."""
+        self._flash = color
+        self._flash_end = ticks_add(ticks_ms(), duration_ms)
+        self._show(color[0], color[1], color[2])
+
+    def _begin(self, effect: int, color, on_ms: int, off_ms: int) -> None:
+        self._effect = effect
+        self._color = color
+        self._on_ms = on_ms
+        self._off_ms = off_ms
+        self._start = ticks_ms()
+        # Show the first step now rather than up to frame_ms later
+        self._last_tick = ticks_add(self._start, -self._frame_ms)
+
+    def tick(self) -> None:
+        """Advance the running effect; cheap to call every loop pass."""
+        now = ticks_ms()
+        if ticks_diff(now, self._last_tick) < self._frame_ms:
+            return
+        self._last_tick = now
+        self.ticks += 1
+
+        if self._flash is not None:
+            if ticks_diff(now, self._flash_end) < 0:
+                return
+            self._flash = None
+
+        effect = self._effect
+        if effect == SOLID:
+            level = 255
+        elif effect == PULSE:
+            period = self._on_ms
+            half = period // 2
+            t = ticks_diff(now, self._start) % period
+            if t < half:
+                level = t * 255 // half
+            else:
+                level = (period - t) * 255 // (period - half)
+        elif effect == BLINK:
+            t = ticks_diff(now, self._start) % (self._on_ms + self._off_ms)
+            level = 255 if t < self._on_ms else 0
+        else:
+            t = min(ticks_diff(now, self._start), self._on_ms)
+            level = 255 - t * 255 // self._on_ms
+
+        color = self._color
+        self._show(color[0] * level // 255, color[1] * level // 255, color[2] * level // 255)
+
+    def _show(self, r: int, g: int, b: int) -> None:
+        if r == self._r and g == self._g and b == self._b:
+            self.skipped += 1
+            return
+        self._r = r
+        self._g = g
+        self._b = b
+
+        start = self.write_timer.start()
+        self._pixels[0] = (r, g, b)
+        self._pixels.show()
+        self.write_timer.stop(start)
+
+    @property
+    def writes(self) -> int:
+        return self.write_timer.calls
+
+    def summary(self) -> str:
+        return "skipped={} ticks={}, writes: {}".format(self.skipped, self.ticks, self.write_timer.summary())
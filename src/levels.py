@@ -0,0 +1,140 @@
+"""
+levels.py
+
+Level data for Thunder Fighter.
+
+Levels live in a compiled pack on flash (levels.bin, built from
+host/levels.txt by host/compile_levels.py) and are read one at a time
+into a single reusable buffer, so RAM use does not grow with the number
+of levels.
+
+Pack layout, little endian:
+    header  "<4sBBHB"  magic b"TFL1", version, lanes, level count,
+                       longest level (spawns)
+    index   "<H" per level, file offset of the level
+    level   "<BB"      spawn count, flags
+            "<B"       speed in percent of the difficulty speed, if FLAG_SPEED
+            "<H"       ms between spawns, if FLAG_INTERVAL
+            one byte per spawn: the lane
+
+With an endless seed, levels past the end of the pack are generated into
+the same buffer by a 16-bit xorshift PRNG. The same seed always gives
+the same levels.
+"""
+
+import struct
+
+MAGIC = b"TFL1"
+VERSION = 1
+HEADER = "<4sBBHB"
+HEADER_SIZE = struct.calcsize(HEADER)
+INDEX = "<H"
+INDEX_SIZE = struct.calcsize(INDEX)
+LEVEL = "<BB"
+LEVEL_SIZE = struct.calcsize(LEVEL)
+
+FLAG_SPEED = 1
+FLAG_INTERVAL = 2
+
+DEFAULT_SPEED = 100
+DEFAULT_INTERVAL_MS = 1000
+
+# Generated levels: spawns grow with the level up to ENDLESS_SPAWNS
+ENDLESS_SPAWNS = 16
+
+
+def _default_path() -> str:
+    # Next to this module: CIRCUITPY root on the board, src/ on a laptop
+    if "/" in __file__:
+        return __file__.rsplit("/", 1)[0] + "/levels.bin"
+    return "levels.bin"
+
+
+LEVELS_FILE = _default_path()
+
+
+class LevelPack:
+    def __init__(self, path: str = LEVELS_FILE, endless_seed=None):
+        """
+        path: compiled level pack
+        endless_seed: None ends the game after the last packed level,
+                      an int continues with generated levels
+        """
+        self._file = open(path, "rb")
+        header = self._file.read(HEADER_SIZE)
+        if len(header) != HEADER_SIZE:
+            raise ValueError("level pack too short")
+        magic, version, lanes, count, longest = struct.unpack(HEADER, header)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("not a level pack")
+        if lanes == 0:
+            raise ValueError("level pack has no lanes")
+
+        self.lanes = lanes
+        self.packed = count
+        self._seed = endless_seed
+
+        # None: no last level
+        self.count = None if endless_seed is not None else count
+        self.max_spawns = longest
+        if endless_seed is not None and ENDLESS_SPAWNS > longest:
+            self.max_spawns = ENDLESS_SPAWNS
+
+        self.buffer = bytearray(self.max_spawns)
+        self._word = bytearray(2)
+        self.length = 0
+        self.speed = DEFAULT_SPEED
+        self.interval_ms = DEFAULT_INTERVAL_MS
+
+    def load(self, level: int) -> int:
+        """Load 1-based level into buffer. Returns its spawn count."""
+        if level > self.packed and self._seed is not None:
+            self._generate(level)
+            return self.length
+
+        index = max(0, min(level, self.packed) - 1)
+        f = self._file
+        f.seek(HEADER_SIZE + index * INDEX_SIZE)
+        f.readinto(self._word)
+        f.seek(struct.unpack(INDEX, self._word)[0])
+
+        f.readinto(self._word)
+        count, flags = struct.unpack(LEVEL, self._word)
+
+        self.speed = DEFAULT_SPEED
+        if flags & FLAG_SPEED:
+            self.speed = f.read(1)[0]
+        self.interval_ms = DEFAULT_INTERVAL_MS
+        if flags & FLAG_INTERVAL:
+            f.readinto(self._word)
+            self.interval_ms = struct.unpack("<H", self._word)[0]
+
+        f.readinto(memoryview(self.buffer)[:count])
+        self.length = count
+        return count
+
+    def _generate(self, level: int) -> None:
+        n = level - self.packed
+        # Mix seed and level so every level is reachable on its own
+        state = (self._seed * 31 + level * 0x9E37) & 0xFFFF or 0xACE1
+
+        count = min(self.max_spawns, 6 + n // 2)
+        buffer = self.buffer
+        last = -1
+        for i in range(count):
+            state ^= (state << 7) & 0xFFFF
+            state ^= state >> 9
+            state ^= (state << 8) & 0xFFFF
+            lane = state % self.lanes
+            # Never three in a row down the same lane (unless there is only one)
+            if lane == last and i > 1 and buffer[i - 2] == lane and self.lanes > 1:
+                lane = (lane + 1 + (state >> 8) % (self.lanes - 1)) % self.lanes
+            buffer[i] = lane
+            last = lane
+
+        self.length = count
+        self.speed = min(255, DEFAULT_SPEED + 5 * n)
+        self.interval_ms = max(400, DEFAULT_INTERVAL_MS - 25 * n)
+
+    def close(self) -> None:
+        self._file.close()
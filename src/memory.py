@@ -0,0 +1,102 @@
+"""
+memory.py
+
+Deterministic garbage collection for Thunder Fighter.
+
+The game allocates its working objects up front (enemy pool, occupancy
+masks, spawn timeline, cached screens), so little garbage builds up
+during play. MemoryManager makes the collections that are still needed
+happen where a pause cannot be seen:
+- collect() is called at safe points: level loads, screen changes and
+  the start of calibration
+- begin_play() switches the allocation threshold off, so during a level
+  the heap is only collected if it actually runs out; end_play() sets a
+  low threshold again so idle screens collect early and often
+- frame_start() / frame_end() around a frame measure how much it
+  allocated and warn over serial when that is above the budget
+
+gc.mem_free() and gc.threshold() are CircuitPython / MicroPython only;
+without them the manager still collects but does not measure.
+"""
+
+import gc
+
+from adafruit_ticks import ticks_ms, ticks_diff
+
+_mem_free = getattr(gc, "mem_free", None)
+_threshold = getattr(gc, "threshold", None)
+
+
+class MemoryManager:
+    def __init__(self, budget: int = 1024, idle_threshold: int = 4096, warn_ms: int = 1000):
+        """
+        budget: bytes one frame may allocate before a warning is printed
+        idle_threshold: gc.threshold() outside play
+        warn_ms: least time between two budget warnings
+        """
+        self.budget = budget
+        self._idle_threshold = idle_threshold
+        self._warn_ms = warn_ms
+        self._last_warn = ticks_ms()
+        self._frame_free = -1
+
+        self.collections = 0
+        self.collect_ms = 0
+        self.worst_collect_ms = 0
+        self.over_budget = 0
+        self.worst_frame = 0
+        self.free_after = _mem_free() if _mem_free is not None else -1
+
+        self.end_play()
+
+    def collect(self) -> None:
+        start = ticks_ms()
+        gc.collect()
+        spent = ticks_diff(ticks_ms(), start)
+
+        self.collections += 1
+        self.collect_ms += spent
+        if spent > self.worst_collect_ms:
+            self.worst_collect_ms = spent
+        if _mem_free is not None:
+            self.free_after = _mem_free()
+
+    def begin_play(self) -> None:
+        self.collect()
+        if _threshold is not None:
+            _threshold(-1)
+
+    def end_play(self) -> None:
+        if _threshold is not None:
+            _threshold(self._idle_threshold)
+
+    def frame_start(self) -> None:
+        if _mem_free is not None:
+            self._frame_free = _mem_free()
+
+    def frame_end(self) -> None:
+        if self._frame_free < 0:
+            return
+        allocated = self._frame_free - _mem_free()
+        self._frame_free = -1
+        # Negative: a collection ran inside the frame, nothing to measure
+        if allocated <= self.budget:
+            return
+
+        self.over_budget += 1
+        if allocated > self.worst_frame:
+            self.worst_frame = allocated
+        now = ticks_ms()
+        if ticks_diff(now, self._last_warn) >= self._warn_ms:
+            self._last_warn = now
+            print("frame allocated", allocated, "B, budget", self.budget, "B")
+
+    def summary(self) -> str:
+        return "collections={} avg={}ms worst={}ms free={}B over_budget={} worst_frame={}B".format(
+            self.collections,
+            self.collect_ms // self.collections if self.collections else 0,
+            self.worst_collect_ms,
+            self.free_after,
+            self.over_budget,
+            self.worst_frame,
+        )
@@ -0,0 +1,96 @@
+"""
+playfield.py
+
+TileGrid based playfield for Thunder Fighter.
+
+The whole cols x rows game grid is one displayio.TileGrid backed by a tiny
+sprite sheet, so drawing a frame is just a few tile-index writes for the
+cells that changed:
+- TILE_EMPTY       : nothing (transparent)
+- TILE_ENEMY       : enemy plane "X"
+- TILE_PLAYER      : player plane "+"
+- TILE_INVINCIBLE  : invincible player "*"
+"""
+
+import displayio
+
+CELL_W = 16
+CELL_H = 11
+
+TILE_EMPTY = 0
+TILE_ENEMY = 1
+TILE_PLAYER = 2
+TILE_INVINCIBLE = 3
+
+# 5x7 glyphs, one string per pixel row
+GLYPHS = {
+    "X": ("#...#", "#...#", ".#.#.", "..#..", ".#.#.", "#...#", "#...#"),
+    "+": (".....", "..#..", "..#..", "#####", "..#..", "..#..", "....."),
+    "*": (".....", "..#..", "#.#.#", ".###.", "#.#.#", "..#..", "....."),
+}
+
+_SHEET = (None, "X", "+", "*")
+
+
+def draw_glyph(bitmap, ch: str, x: int, y: int, color: int = 1) -> None:
+    rows = GLYPHS[ch]
+    for gy in range(len(rows)):
+        row = rows[gy]
+        for gx in range(len(row)):
+            if row[gx] == "#":
+                bitmap[x + gx, y + gy] = color
+
+
+class Playfield:
+    def __init__(self, cols: int, rows: int, x: int = 4, y: int = 5, damage=None):
+        """
+        cols, rows: grid size in cells
+        x, y: screen position of the top-left cell
+        damage: optional RefreshController told about every changed cell
+        """
+        self.cols = cols
+        self.rows = rows
+        self._x = x
+        self._y = y
+        self._damage = damage
+
+        sheet = displayio.Bitmap(CELL_W * len(_SHEET), CELL_H, 2)
+        for tile in range(len(_SHEET)):
+            if _SHEET[tile] is not None:
+                draw_glyph(sheet, _SHEET[tile], tile * CELL_W, (CELL_H - 7) // 2)
+
+        palette = displayio.Palette(2)
+        palette[0] = 0x000000
+        palette[1] = 0xFFFFFF
+        palette.make_transparent(0)
+
+        self.grid = displayio.TileGrid(
+            sheet,
+            pixel_shader=palette,
+            width=cols,
+            height=rows,
+            tile_width=CELL_W,
+            tile_height=CELL_H,
+            default_tile=TILE_EMPTY,
+            x=x,
+            y=y,
+        )
+
+        # Shadow copy of the tile indices currently on the grid
+        self._tiles = bytearray(cols * rows)
+
+    def set_cell(self, x: int, y: int, tile: int) -> bool:
+        """Show tile at cell (x, y). Returns False if it was already there."""
+        i = y * self.cols + x
+        if self._tiles[i] == tile:
+            return False
+        self._tiles[i] = tile
+        self.grid[i] = tile
+        if self._damage is not None:
+            self._damage.mark(self._x + x * CELL_W, self._y + y * CELL_H, CELL_W, CELL_H)
+        return True
+
+    def clear(self) -> None:
+        for i in range(len(self._tiles)):
+            if self._tiles[i] != TILE_EMPTY:
+                self.set_cell(i % self.cols, i // self.cols, TILE_EMPTY)
@@ -0,0 +1,128 @@
+"""
+power.py
+
+Low-power idle for the menu, result and high score screens.
+
+While input arrives the loop keeps polling every millisecond. After
+idle_after_ms without any, idle() light-sleeps between passes instead:
+- with wake pins (and release / claim callbacks to free them), the
+  board sleeps up to sleep_ms and any of the pins going low wakes it at
+  once; idle() then reports which pin it was in wake_pin
+- without them, or where alarm.pin cannot watch a pin, it sleeps one
+  poll_ms frame on a TimeAlarm, so a press is seen within a frame
+
+The ESP32 ports only wake on a pin level, not an edge, and a PinAlarm
+needs a pin nobody else holds: release() must deinit whatever holds the
+wake pins and claim() set them up again after the sleep. The wake pins
+must rest high: buttons with pull-ups are fine, but an encoder may stop
+on a detent with a contact closed and would wake the board at once.
+
+Boards without the alarm module fall back to time.sleep(), which still
+lowers the polling rate. summary() reports time asleep against awake.
+"""
+
+import time
+
+from adafruit_ticks import ticks_ms, ticks_diff
+
+try:
+    import alarm
+except ImportError:
+    alarm = None
+
+
+class PowerManager:
+    def __init__(
+        self,
+        wake_pins=(),
+        *,
+        idle_after_ms: int = 10000,
+        poll_ms: int = 40,
+        sleep_ms: int = 500,
+        release=None,
+        claim=None,
+    ):
+        """
+        wake_pins: pins that wake the board when they go low
+        idle_after_ms: time without activity() before sleeping
+        poll_ms: timer-only sleep, one frame
+        sleep_ms: longest sleep while the wake pins are armed
+        release / claim: free the wake pins before a sleep, take them back after
+        """
+        self._wake_pins = tuple(wake_pins)
+        self._idle_after_ms = idle_after_ms
+        self._poll_ms = poll_ms
+        self._sleep_ms = sleep_ms
+        self._release = release
+        self._claim = claim
+        self._pin_wake = bool(self._wake_pins) and release is not None and claim is not None
+
+        self._mark = ticks_ms()
+        self._last_activity = self._mark
+        self.sleeping = False
+        self.wake_pin = None
+
+        self.sleeps = 0
+        self.pin_wakes = 0
+        self.asleep_ms = 0
+        self.awake_ms = 0
+
+    def activity(self) -> None:
+        """Input arrived: poll at full rate again."""
+        self._last_activity = ticks_ms()
+        self.sleeping = False
+
+    def idle(self) -> bool:
+        """Sleep if there has been no activity for a while. Returns True if it slept."""
+        self.wake_pin = None
+        now = ticks_ms()
+        if ticks_diff(now, self._last_activity) < self._idle_after_ms:
+            return False
+        self.sleeping = True
+        self.awake_ms += ticks_diff(now, self._mark)
+
+        if alarm is None:
+            time.sleep(self._poll_ms / 1000)
+        elif self._pin_wake:
+            self._sleep_on_pins()
+        else:
+            alarm.light_sleep_until_alarms(self._time_alarm(self._poll_ms))
+
+        self._mark = ticks_ms()
+        self.sleeps += 1
+        self.asleep_ms += ticks_diff(self._mark, now)
+        if self.wake_pin is not None:
+            self.pin_wakes += 1
+            self.activity()
+        return True
+
+    def _time_alarm(self, ms: int):
+        return alarm.time.TimeAlarm(monotonic_time=time.monotonic() + ms / 1000)
+
+    def _sleep_on_pins(self) -> None:
+        self._release()
+        try:
+            alarms = [alarm.pin.PinAlarm(pin, value=False, pull=True) for pin in self._wake_pins]
+            alarms.append(self._time_alarm(self._sleep_ms))
+            woke = alarm.light_sleep_until_alarms(*alarms)
+        except (ValueError, NotImplementedError) as e:
+            # Port cannot watch these pins: fall back to timer wakes
+            print("pin wake unavailable:", e)
+            self._pin_wake = False
+            woke = None
+        finally:
+            self._claim()
+
+        if woke is not None and hasattr(woke, "pin"):
+            self.wake_pin = woke.pin
+
+    def summary(self) -> str:
+        awake = self.awake_ms + ticks_diff(ticks_ms(), self._mark)
+        total = max(1, awake + self.asleep_ms)
+        return "asleep {} ms / awake {} ms ({}% asleep), sleeps={} pin_wakes={}".format(
+            self.asleep_ms,
+            awake,
+            self.asleep_ms * 100 // total,
+            self.sleeps,
+            self.pin_wakes,
+        )
@@ -0,0 +1,197 @@
+"""
+profiler.py
+
+On-device frame profiler for Thunder Fighter.
+
+code.py times each stage of a frame (encoder, buttons, tilt read, game
+update, draw, display flush) with start()/stop() and calls sample()
+once per pass. The last `size` timings of every stage and the last
+`size` gc.mem_free() readings are kept in fixed ring buffers, so the
+profiler does not allocate while it records.
+
+A rise in free heap between two samples means a collection ran; those
+are counted as GC events together with the largest drop seen.
+
+summary() sorts copies of the rings for p50 / p95 / max, so only call
+it outside play. Send "p" over the USB serial console to get one at any
+time, or set PROFILE_OVERLAY for an FPS / free-heap label in the game.
+
+Profiling is off unless PROFILE is set in code.py; then code.py holds
+None instead of a Profiler and every stage costs one "is not None" test.
+
+CallTimer is the call counter the bus scheduler, status LED and runtime
+tasks keep. It only counts unless timing is on: time.monotonic_ns()
+returns a heap-allocated long int on the board, so microsecond timing
+would make garbage every frame, and code.py only turns it on with
+PROFILE.
+"""
+
+import gc
+import sys
+import time
+from array import array
+
+import terminalio
+from adafruit_display_text import label
+from adafruit_ticks import ticks_ms, ticks_diff
+
+try:
+    import supervisor
+except ImportError:
+    supervisor = None
+
+ENCODER = 0
+BUTTONS = 1
+TILT = 2
+UPDATE = 3
+DRAW = 4
+FLUSH = 5
+STAGE_NAMES = ("encoder", "buttons", "tilt", "update", "draw", "flush")
+
+
+# CircuitPython only; without it the heap is not sampled
+_mem_free = getattr(gc, "mem_free", None)
+
+
+def _percentile(values, pct: int) -> int:
+    return values[min(len(values) - 1, len(values) * pct // 100)]
+
+
+class CallTimer:
+    """Call count, plus total and worst time in us when timing is on."""
+
+    def __init__(self, timing: bool = False):
+        self.timing = timing
+        self.calls = 0
+        self.busy_us = 0
+        self.worst_us = 0
+
+    def start(self) -> int:
+        """Mark the start of a call; pass the result to stop()."""
+        return time.monotonic_ns() if self.timing else 0
+
+    def stop(self, start: int) -> None:
+        self.calls += 1
+        if not self.timing:
+            return
+        spent = (time.monotonic_ns() - start) // 1000
+        self.busy_us += spent
+        if spent > self.worst_us:
+            self.worst_us = spent
+
+    def summary(self) -> str:
+        if not self.timing:
+            return "{} calls".format(self.calls)
+        return "{} calls, {} ms, avg {} us, worst {} us".format(
+            self.calls,
+            self.busy_us // 1000,
+            self.busy_us // self.calls if self.calls else 0,
+            self.worst_us,
+        )
+
+
+class Profiler:
+    def __init__(self, size: int = 64, damage=None):
+        """
+        size: samples kept per stage and for the heap, at most 255
+        damage: optional RefreshController told about overlay changes
+        """
+        size = min(255, size)
+        self._size = size
+        self._damage = damage
+
+        self._times = [array("L", [0] * size) for _ in STAGE_NAMES]
+        self._count = bytearray(len(STAGE_NAMES))
+        self._next = bytearray(len(STAGE_NAMES))
+
+        self._heap = array("L", [0] * size)
+        self._heap_count = 0
+        self._heap_next = 0
+        self._last_free = _mem_free() if _mem_free is not None else 0
+        self.gc_events = 0
+        self.worst_drop = 0
+
+        self._frames = 0
+        self._fps_start = ticks_ms()
+        self.fps = 0
+        self._overlay = None
+
+    def start(self) -> int:
+        return time.monotonic_ns()
+
+    def stop(self, stage: int, start: int) -> None:
+        i = self._next[stage]
+        self._times[stage][i] = (time.monotonic_ns() - start) // 1000
+        self._next[stage] = (i + 1) % self._size
+        if self._count[stage] < self._size:
+            self._count[stage] += 1
+
+    def sample(self) -> None:
+        """Record free heap; call once per loop pass."""
+        if _mem_free is None:
+            return
+        free = _mem_free()
+        if free > self._last_free:
+            self.gc_events += 1
+        elif self._last_free - free > self.worst_drop:
+            self.worst_drop = self._last_free - free
+        self._last_free = free
+
+        self._heap[self._heap_next] = free
+        self._heap_next = (self._heap_next + 1) % self._size
+        if self._heap_count < self._size:
+            self._heap_count += 1
+
+    def frame(self) -> None:
+        """Count a rendered frame; refreshes fps and the overlay once a second."""
+        self._frames += 1
+        elapsed = ticks_diff(ticks_ms(), self._fps_start)
+        if elapsed < 1000:
+            return
+        self.fps = self._frames * 1000 // elapsed
+        self._frames = 0
+        self._fps_start = ticks_ms()
+
+        if self._overlay is not None:
+            old_len = len(self._overlay.text)
+            self._overlay.text = "{}f {}k".format(self.fps, self._last_free // 1024)
+            if self._damage is not None:
+                self._damage.mark_label(self._overlay, old_len)
+
+    def overlay(self, x: int = 40, y: int = 8):
+        """Label showing fps and free heap, append it to a displayio Group."""
+        if self._overlay is None:
+            self._overlay = label.Label(terminalio.FONT, text="--f --k", x=x, y=y)
+        return self._overlay
+
+    def poll_serial(self) -> None:
+        """Print a summary when "p" arrives on the USB serial console."""
+        if supervisor is None or not supervisor.runtime.serial_bytes_available:
+            return
+        if sys.stdin.read(1) == "p":
+            print(self.summary())
+
+    def summary(self) -> str:
+        lines = []
+        for stage in range(len(STAGE_NAMES)):
+            count = self._count[stage]
+            if not count:
+                continue
+            values = sorted(self._times[stage][:count])
+            lines.append(
+                "{:8} p50 {} us, p95 {} us, max {} us".format(
+                    STAGE_NAMES[stage],
+                    _percentile(values, 50),
+                    _percentile(values, 95),
+                    values[-1],
+                )
+            )
+        if self._heap_count:
+            heap = self._heap[: self._heap_count]
+            lines.append(
+                "heap     free min {} / last {} B, gc {}, worst drop {} B".format(
+                    min(heap), self._last_free, self.gc_events, self.worst_drop
+                )
+            )
+        lines.append("{} fps".format(self.fps))
+        return "\n".join(lines)
@@ -0,0 +1,123 @@
+"""
+refresh.py
+
+Manual, page-based refresh control for the SSD1306.
+
+With auto_refresh on, displayio pushes changes over the shared I2C bus
+whenever it likes. RefreshController switches auto_refresh off and only
+calls display.refresh() when something was marked dirty, at most fps
+times per second.
+
+Changes are tracked per SSD1306 page (a stripe of 8 pixel rows, one byte
+per column) as a dirty column span. These spans only decide whether a
+refresh is needed: display.refresh() pushes whatever areas displayio
+itself has marked dirty, which the controller cannot see. From the
+spans it estimates how many framebuffer bytes a flush needed, so bus
+cost per frame can be compared against the 1 KB of a full-screen push;
+bytes_last / bytes_total are those estimates, not measured traffic.
+Swapping display.root_group dirties the whole screen.
+"""
+
+from adafruit_ticks import ticks_ms, ticks_diff
+
+PAGE_ROWS = 8
+
+# Page + column addressing commands sent ahead of each page's data
+PAGE_OVERHEAD = 6
+
+
+class RefreshController:
+    def __init__(self, display, fps: int = 25, width: int = 128, height: int = 64):
+        self._display = display
+        self._width = width
+        self._pages = height // PAGE_ROWS
+        self._interval_ms = 1000 // max(1, fps)
+
+        # Dirty column span [lo, hi) per page, lo == hi means clean.
+        # SSD1306 panels are at most 128 wide, so a byte per bound is enough.
+        self._lo = bytearray(self._pages)
+        self._hi = bytearray(self._pages)
+        self._any = False
+        self._root = None
+        self._last = ticks_ms()
+
+        self.flushes = 0
+        # Estimated from the dirty spans, see the module docstring
+        self.bytes_last = 0
+        self.pages_last = 0
+        self.bytes_total = 0
+
+        display.auto_refresh = False
+        self.mark_all()
+
+    def mark(self, x: int, y: int, w: int, h: int) -> None:
+        """Mark the pixel rectangle (x, y, w, h) as changed."""
+        x0 = max(0, x)
+        x1 = min(self._width, x + w)
+        if x1 <= x0 or h <= 0:
+            return
+        p0 = max(0, y // PAGE_ROWS)
+        p1 = min(self._pages - 1, (y + h - 1) // PAGE_ROWS)
+        lo = self._lo
+        hi = self._hi
+        for page in range(p0, p1 + 1):
+            if lo[page] == hi[page]:
+                lo[page] = x0
+                hi[page] = x1
+            else:
+                if x0 < lo[page]:
+                    lo[page] = x0
+                if x1 > hi[page]:
+                    hi[page] = x1
+            self._any = True
+
+    def mark_label(self, text_label, old_len: int) -> None:
+        """Mark a terminalio label whose text was just changed."""
+        chars = max(old_len, len(text_label.text))
+        self.mark(text_label.x, text_label.y - 7, chars * 6, 14)
+
+    def mark_all(self) -> None:
+        for page in range(self._pages):
+            self._lo[page] = 0
+            self._hi[page] = self._width
+        self._any = True
+
+    def flush(self, force: bool = False) -> bool:
+        """Refresh if anything is dirty and a frame is due. Returns True if sent."""
+        root = self._display.root_group
+        if root is not self._root:
+            self._root = root
+            self.mark_all()
+
+        if not self._any:
+            return False
+
+        now = ticks_ms()
+        if not force and ticks_diff(now, self._last) < self._interval_ms:
+            return False
+        self._last = now
+
+        self._display.refresh(target_frames_per_second=None)
+
+        sent = 0
+        pages = 0
+        for page in range(self._pages):
+            span = self._hi[page] - self._lo[page]
+            if span:
+                sent += span + PAGE_OVERHEAD
+                pages += 1
+                self._lo[page] = 0
+                self._hi[page] = 0
+        self._any = False
+
+        self.flushes += 1
+        self.bytes_last = sent
+        self.pages_last = pages
+        self.bytes_total += sent
+        return True
+
+    def summary(self) -> str:
+        per_flush = self.bytes_total // self.flushes if self.flushes else 0
+        return "flushes={} est_bytes={} est_bytes/flush={} est_last={}B/{}pages".format(
+            self.flushes, self.bytes_total, per_flush, self.bytes_last, self.pages_last
+        )
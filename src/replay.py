@@ -0,0 +1,148 @@
+"""
+replay.py
+
+Deterministic input recording and replay for Thunder Fighter.
+
+A session is a small header followed by one fixed-size record per
+PLAYING loop pass:
+    dt (uint16, ms), dx, dy (int16 tilt in mm/s^2, -32768 = no reading),
+    flags (uint8: bit 0 invincibility pressed, bit 1 confirm button fell)
+
+These are the integers the game engine runs on, so a recorded session
+replays bit-for-bit identical input into handle_input_fp()/update_ms().
+Only this version is read; older float recordings are rejected.
+
+Records go to any binary stream (a file on flash) or, with SerialSink,
+as hex lines over USB serial that host/replay.py can turn back into a
+session file.
+"""
+
+import struct
+
+MAGIC = b"TFR1"
+VERSION = 2
+
+# magic, version, fixed-timestep flag, sim_hz, difficulty name
+HEADER = "<4sBBH8s"
+HEADER_SIZE = struct.calcsize(HEADER)
+
+RECORD = "<HhhB"
+RECORD_SIZE = struct.calcsize(RECORD)
+
+NO_READING = -32768
+
+FLAG_INVINCIBLE = 0x01
+FLAG_BUTTON = 0x02
+
+SERIAL_PREFIX = "TFR:"
+
+
+def _clamp16(v: int) -> int:
+    return NO_READING + 1 if v <= NO_READING else min(32767, v)
+
+
+class SerialSink:
+    """Binary stream stand-in that prints hex lines, for recording over USB."""
+
+    def __init__(self, prefix: str = SERIAL_PREFIX):
+        self._prefix = prefix
+
+    def write(self, data) -> int:
+        print(self._prefix + "".join("{:02x}".format(b) for b in data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class InputRecorder:
+    def __init__(self, stream, difficulty_name: str, *, fixed: bool = True, sim_hz: int = 60, chunk: int = 32):
+        """
+        stream: binary stream to write to (file opened "wb" or SerialSink)
+        chunk: records buffered in RAM between writes, keeps flash writes rare
+        """
+        self._stream = stream
+        self._chunk = bytearray(RECORD_SIZE * max(1, chunk))
+        self._used = 0
+        self.frames = 0
+
+        name = difficulty_name.encode() if difficulty_name else b""
+        stream.write(struct.pack(HEADER, MAGIC, VERSION, 1 if fixed else 0, sim_hz, name))
+
+    def record(self, dt_ms: int, dx, dy, invincible_pressed: bool, btn_fell: bool) -> None:
+        """dt_ms: frame time in ms; dx, dy: tilt in mm/s^2 or None."""
+        flags = 0
+        if invincible_pressed:
+            flags |= FLAG_INVINCIBLE
+        if btn_fell:
+            flags |= FLAG_BUTTON
+
+        struct.pack_into(
+            RECORD,
+            self._chunk,
+            self._used,
+            min(0xFFFF, dt_ms),
+            NO_READING if dx is None else _clamp16(dx),
+            NO_READING if dy is None else _clamp16(dy),
+            flags,
+        )
+        self._used += RECORD_SIZE
+        self.frames += 1
+        if self._used >= len(self._chunk):
+            self.flush()
+
+    def flush(self) -> None:
+        if self._used:
+            self._stream.write(memoryview(self._chunk)[: self._used])
+            self._used = 0
+        if hasattr(self._stream, "flush"):
+            self._stream.flush()
+
+    def close(self) -> None:
+        self.flush()
+        self._stream.close()
+
+
+class InputReplay:
+    def __init__(self, stream):
+        """stream: binary stream positioned at the start of a session."""
+        self._stream = stream
+        header = stream.read(HEADER_SIZE)
+        if header is None or len(header) < HEADER_SIZE:
+            raise ValueError("not an input recording")
+
+        magic, version, fixed, sim_hz, name = struct.unpack(HEADER, header)
+        if magic != MAGIC:
+            raise ValueError("not an input recording")
+        if version != VERSION:
+            raise ValueError("input recording version {}, expected {}".format(version, VERSION))
+
+        self.fixed = bool(fixed)
+        self.sim_hz = sim_hz
+        self.difficulty = name.rstrip(b"\0").decode() or None
+        self._buf = bytearray(RECORD_SIZE)
+        self.frames = 0
+
+    def next(self):
+        """
+        Next frame as (dt_ms, dx, dy, invincible_pressed, btn_fell), tilt
+        in mm/s^2, or None once the recording is exhausted.
+        """
+        if self._stream.readinto(self._buf) != len(self._buf):
+            return None
+        self.frames += 1
+
+        dt_ms, dx, dy, flags = struct.unpack(RECORD, self._buf)
+        return (
+            dt_ms,
+            None if dx == NO_READING else dx,
+            None if dy == NO_READING else dy,
+            bool(flags & FLAG_INVINCIBLE),
+            bool(flags & FLAG_BUTTON),
+        )
+
+    def close(self) -> None:
+        self._stream.close()
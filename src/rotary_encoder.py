@@ -1,92 +1,131 @@
-import time
 import digitalio
+from adafruit_ticks import ticks_ms, ticks_diff
 
-class RotaryEncoder:
-    """
-    RotaryEncoder(pin_a, pin_b, *, pull=digitalio.Pull.UP, debounce_ms=3, pulses_per_detent=4)
+try:
+    import rotaryio
+except ImportError:
+    rotaryio = None
 
-    - pin_a, pin_b: board pin objects (e.g. board.D1, board.D0)
-    - debounce_ms: stable time (ms) before accepting a new state 
-    - pulses_per_detent: number of encoder edges per visible detent. Set to 1 if you want
-      raw edges, or to 4 for many encoders so 1 detent == 1 step.
-    """
 
-    # Quadrature Table
-    _TRANSITIONS = {
-        0b0001:  1,  
-        0b0011:  1,  
-        0b0111:  1,  
-        0b0100: -1,  
-        0b1110:  1,  
-        0b1101: -1,  
-        0b1000:  1,  
-        0b1011: -1,  
-        }
-
-    def __init__(self, pin_a, pin_b, *, pull=digitalio.Pull.UP, debounce_ms=3, pulses_per_detent=3):
+# Quadrature steps indexed by (previous AB << 2) | current AB.
+# Same values the old dict + modular fallback produced for every pair.
+_STEPS = (
+    0, 1, 2, 1,
+    -1, 0, 1, 1,
+    1, -1, 0, -1,
+    1, -1, 1, 0,
+)
+
+
+class _CountedBackend:
+    """Edges counted by rotaryio (PCNT hardware or a background IRQ)."""
+
+    name = "rotaryio"
+    # Every edge of the 4-edge quadrature cycle is counted
+    pulses_per_detent = 4
+
+    def __init__(self, pin_a, pin_b):
+        # divisor=1 keeps raw edges, detents are applied by RotaryEncoder
+        self._encoder = rotaryio.IncrementalEncoder(pin_a, pin_b, divisor=1)
+
+    def read(self, position_raw):
+        return self._encoder.position
+
+    def set(self, position_raw):
+        self._encoder.position = position_raw
+
+    def deinit(self):
+        self._encoder.deinit()
+
+
+class _PolledBackend:
+    """Debounced software decoder, only sees edges while update() is called."""
+
+    name = "polled"
+    # Tuned on the board against _STEPS, which counts some transitions twice
+    pulses_per_detent = 3
+
+    def __init__(self, pin_a, pin_b, pull, debounce_ms):
         self._a = digitalio.DigitalInOut(pin_a)
         self._a.switch_to_input(pull=pull)
         self._b = digitalio.DigitalInOut(pin_b)
         self._b.switch_to_input(pull=pull)
 
         self._debounce_ms = max(1, int(debounce_ms))
-        self._pulses_per_detent = max(1, int(pulses_per_detent))
 
-        self._last_raw = (self._a.value, self._b.value)
-        self._last_stable = self._last_raw
-        self._last_change_time = time.monotonic() * 1000.0 
+        self._last_raw = self._read_q()
+        self._last_q = self._last_raw
+        self._last_change = ticks_ms()
+
+    def _read_q(self):
+        return (2 if self._a.value else 0) | (1 if self._b.value else 0)
 
-        self._last_q = (1 if self._last_stable[0] else 0) << 1 | (1 if self._last_stable[1] else 0)
+    def read(self, position_raw):
+        raw = self._read_q()
+        now = ticks_ms()
+        if raw != self._last_raw:
+            self._last_raw = raw
+            self._last_change = now
+            return position_raw
+
+        if raw != self._last_q and ticks_diff(now, self._last_change) >= self._debounce_ms:
+            position_raw += _STEPS[(self._last_q << 2) | raw]
+            self._last_q = raw
+        return position_raw
+
+    def set(self, position_raw):
+        pass
+
+    def deinit(self):
+        self._a.deinit()
+        self._b.deinit()
+
+
+class RotaryEncoder:
+    """
+    RotaryEncoder(pin_a, pin_b, *, pull=digitalio.Pull.UP, debounce_ms=3, pulses_per_detent=None, counted=None)
+
+    - pin_a, pin_b: board pin objects (e.g. board.D1, board.D0)
+    - debounce_ms: stable time (ms) before accepting a new state (polled backend only)
+    - pulses_per_detent: number of encoder edges per visible detent. None uses the
+      backend's own: 4 for rotaryio, 3 for the polled decoder. Set to 1 for raw edges.
+    - counted: True forces rotaryio.IncrementalEncoder, False the polled decoder,
+      None uses rotaryio when the build has it. The counted backend keeps
+      counting between update() calls, so long frames do not lose detents.
+    """
+
+    def __init__(self, pin_a, pin_b, *, pull=digitalio.Pull.UP, debounce_ms=3, pulses_per_detent=None, counted=None):
+        if counted is None:
+            counted = rotaryio is not None
+        if counted:
+            self._backend = _CountedBackend(pin_a, pin_b)
+        else:
+            self._backend = _PolledBackend(pin_a, pin_b, pull, debounce_ms)
+
+        if pulses_per_detent is None:
+            pulses_per_detent = self._backend.pulses_per_detent
+        self._pulses_per_detent = max(1, int(pulses_per_detent))
 
         self._position_raw = 0
         self._position = 0
         self._delta_accum = 0
 
-    @staticmethod
-    def _pack(state):
-        
-        return (1 if state[0] else 0) << 1 | (1 if state[1] else 0)
-
-    def _read_raw(self):
-        return (self._a.value, self._b.value)
+    @property
+    def backend(self):
+        return self._backend.name
 
     def update(self):
-        now = time.monotonic() * 1000.0
-        raw = self._read_raw()
-        if raw != self._last_raw:
-            
-            self._last_raw = raw
-            self._last_change_time = now
+        """Pick up new edges. Returns True when the detent position changed."""
+        raw = self._backend.read(self._position_raw)
+        if raw == self._position_raw:
             return False
+        self._position_raw = raw
 
-        if raw != self._last_stable and (now - self._last_change_time) >= self._debounce_ms:
-            prev_q = self._last_q
-            self._last_stable = raw
-            curr_q = self._pack(raw)
-            self._last_q = curr_q
-
-            key = (prev_q << 2) | curr_q
-            move = self._TRANSITIONS.get(key, 0)
-
- 
-            if move == 0:
-                diff = (curr_q - prev_q) % 4
-                if diff == 1:
-                    move = 1
-                elif diff == 3:
-                    move = -1
-                elif diff == 2:
-                    move = 2 if ( (curr_q - prev_q) > 0 ) else -2
-
-            if move != 0:
-                self._position_raw += int(move)
-
-                new_pos = self._position_raw // self._pulses_per_detent
-                if new_pos != self._position:
-                    delta = new_pos - self._position
-                    self._position = new_pos
-                    self._delta_accum += delta
-                    return True
+        new_pos = raw // self._pulses_per_detent
+        if new_pos != self._position:
+            self._delta_accum += new_pos - self._position
+            self._position = new_pos
+            return True
         return False
 
     @property
@@ -104,11 +143,12 @@ class RotaryEncoder:
 
     def reset(self, *, to_detent=None):
         if to_detent is None:
-            self._position_raw = 0
             self._position = 0
         else:
             self._position = int(to_detent)
-            self._position_raw = self._position * self._pulses_per_detent
+        self._position_raw = self._position * self._pulses_per_detent
+        self._backend.set(self._position_raw)
         self._delta_accum = 0
 
-    
\ No newline at end of file
+    def deinit(self):
+        self._backend.deinit()
@@ -0,0 +1,129 @@
+"""
+scheduler.py
+
+Fixed-timestep frame scheduler for Thunder Fighter.
+
+The game simulation always advances in steps of exactly 1/sim_hz seconds,
+no matter how long a loop pass took, while rendering is capped separately
+at render_hz. Time is fed in as integer milliseconds and kept in integer
+accumulators, so no time is lost to rounding.
+
+Typical use per loop pass:
+    steps = scheduler.advance(elapsed_ms)
+    for _ in range(steps):
+        game.update_ms(scheduler.next_step_ms())
+    if scheduler.render_due():
+        game.draw()
+    scheduler.end_frame(work_ms)
+
+next_step_ms() hands out 1/sim_hz in whole milliseconds (16, 17, 17, ...
+at 60 Hz) so that sim_hz steps always add up to exactly one second.
+step_dt is the same step in float seconds.
+"""
+
+
+class FrameScheduler:
+    def __init__(self, sim_hz: int = 60, render_hz: int = 25, max_steps: int = 5):
+        """
+        sim_hz: simulation ticks per second
+        render_hz: maximum draws per second
+        max_steps: most simulation steps run in one pass; time beyond that
+                   is dropped so a long stall cannot snowball
+        """
+        self.sim_hz = max(1, int(sim_hz))
+        self.render_hz = max(1, min(int(render_hz), self.sim_hz))
+        self.max_steps = max(1, int(max_steps))
+
+        self.step_dt = 1.0 / self.sim_hz
+        self.frame_budget_ms = 1000 // self.render_hz
+
+        self.reset()
+
+    def reset(self) -> None:
+        # Accumulators count "ms * hz"; one tick is due every 1000 units
+        self._sim_acc = 0
+        self._render_acc = 1000
+        self._render_due = True
+        self._step_phase = 0
+
+        self.frames = 0
+        self.sim_steps = 0
+        self.renders = 0
+        self.dropped_steps = 0
+        self.over_budget = 0
+        self.work_ms = 0
+        self.elapsed_ms = 0
+        self.worst_ms = 0
+
+    def advance(self, elapsed_ms: int) -> int:
+        """
+        Account elapsed_ms of wall time. Returns how many fixed simulation
+        steps should run now and decides whether this pass renders.
+        """
+        if elapsed_ms < 0:
+            elapsed_ms = 0
+        self.elapsed_ms += elapsed_ms
+
+        self._sim_acc += elapsed_ms * self.sim_hz
+        steps = self._sim_acc // 1000
+        self._sim_acc -= steps * 1000
+        if steps > self.max_steps:
+            self.dropped_steps += steps - self.max_steps
+            steps = self.max_steps
+        self.sim_steps += steps
+
+        # Rendering never catches up: a late render just resets the phase
+        self._render_acc += elapsed_ms * self.render_hz
+        if self._render_acc >= 1000 and steps > 0:
+            self._render_acc -= 1000
+            if self._render_acc >= 1000:
+                self._render_acc = 0
+            self._render_due = True
+        else:
+            self._render_due = False
+
+        return steps
+
+    def next_step_ms(self) -> int:
+        """Length of the next simulation step in whole ms."""
+        k = self._step_phase
+        self._step_phase = k + 1 if k + 1 < self.sim_hz else 0
+        return (k + 1) * 1000 // self.sim_hz - k * 1000 // self.sim_hz
+
+    def render_due(self) -> bool:
+        if self._render_due:
+            self._render_due = False
+            self.renders += 1
+            return True
+        return False
+
+    def end_frame(self, work_ms: int) -> None:
+        """work_ms: time spent on input, update and draw in this pass."""
+        self.frames += 1
+        self.work_ms += work_ms
+        if work_ms > self.worst_ms:
+            self.worst_ms = work_ms
+        if work_ms > self.frame_budget_ms:
+            self.over_budget += 1
+
+    def idle_ms(self) -> int:
+        """Milliseconds until the next simulation step is due."""
+        remaining = 1000 - self._sim_acc
+        return (remaining + self.sim_hz - 1) // self.sim_hz
+
+    def load_percent(self) -> int:
+        """Share of wall time spent working since the last reset."""
+        if self.elapsed_ms <= 0:
+            return 0
+        return (self.work_ms * 100) // self.elapsed_ms
+
+    def summary(self) -> str:
+        return "frames={} steps={} renders={} dropped={} over_budget={} worst={}ms load={}%".format(
+            self.frames,
+            self.sim_steps,
+            self.renders,
+            self.dropped_steps,
+            self.over_budget,
+            self.worst_ms,
+            self.load_percent(),
+        )
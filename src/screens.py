@@ -0,0 +1,121 @@
+"""
+screens.py
+
+Cached text screens for Thunder Fighter (menu, calibrate, game over, ...).
+
+Each screen is built once by its builder and kept as a displayio Group.
+Showing a screen again just swaps display.root_group back to it, and
+Screen.set() only touches a label when its text actually changes.
+
+The cache is capped by a label budget and, where gc.mem_free() exists,
+a free-heap floor. When either is exceeded the least used screens (other
+than the one being shown) are dropped and rebuilt on next use.
+
+With a MemoryManager, every screen change is also a GC safe point.
+"""
+
+import gc
+
+import displayio
+import terminalio
+from adafruit_display_text import label
+
+
+class Screen:
+    def __init__(self, name: str, damage=None):
+        self.name = name
+        self.group = displayio.Group()
+        self.labels = []
+        self.uses = 0
+        self._damage = damage
+
+    def add(self, text: str, x: int, y: int) -> int:
+        """Add a text label, returns its index for set()."""
+        text_label = label.Label(terminalio.FONT, text=text, x=x, y=y)
+        self.group.append(text_label)
+        self.labels.append(text_label)
+        return len(self.labels) - 1
+
+    def set(self, index: int, text: str) -> None:
+        text_label = self.labels[index]
+        if text_label.text != text:
+            old_len = len(text_label.text)
+            text_label.text = text
+            if self._damage is not None:
+                self._damage.mark_label(text_label, old_len)
+
+
+class ScreenManager:
+    def __init__(self, display, max_labels: int = 16, min_free: int = 8192, damage=None, memory=None):
+        """
+        display: display whose root_group is switched
+        max_labels: cap on labels held by all cached screens together
+        min_free: evict screens while gc.mem_free() is below this
+        damage: optional RefreshController told about label changes
+        memory: optional MemoryManager that collects on screen changes
+        """
+        self._display = display
+        self._damage = damage
+        self._memory = memory
+        self._builders = {}
+        self._cache = {}
+        self._max_labels = max_labels
+        self._min_free = min_free
+        self.current = None
+
+        self.builds = 0
+        self.evictions = 0
+
+    def register(self, name: str, builder) -> None:
+        """builder(screen) adds the screen's labels."""
+        self._builders[name] = builder
+
+    def show(self, name: str) -> Screen:
+        screen = self._cache.get(name)
+        if screen is None:
+            screen = self._build(name)
+
+        if self._display.root_group is not screen.group:
+            self._display.root_group = screen.group
+            screen.uses += 1
+            if self._memory is not None:
+                self._memory.collect()
+        self.current = screen
+        return screen
+
+    def cached(self):
+        return list(self._cache)
+
+    def _label_count(self) -> int:
+        total = 0
+        for screen in self._cache.values():
+            total += len(screen.labels)
+        return total
+
+    def _under_pressure(self) -> bool:
+        mem_free = getattr(gc, "mem_free", None)
+        return mem_free is not None and mem_free() < self._min_free
+
+    def _build(self, name: str) -> Screen:
+        if self._under_pressure():
+            gc.collect()
+        screen = Screen(name, self._damage)
+        self._builders[name](screen)
+        self._cache[name] = screen
+        self.builds += 1
+        self._evict(keep=screen)
+        return screen
+
+    def _evict(self, keep: Screen) -> None:
+        while self._label_count() > self._max_labels or self._under_pressure():
+            victim = None
+            for screen in self._cache.values():
+                if screen is keep or screen is self.current:
+                    continue
+                if victim is None or screen.uses < victim.uses:
+                    victim = screen
+            if victim is None:
+                return
+            del self._cache[victim.name]
+            self.evictions += 1
+            gc.collect()
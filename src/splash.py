@@ -0,0 +1,130 @@
+"""
+splash.py
+
+Boot splash for Thunder Fighter: falling "X" planes, then the title.
+
+The falling planes are one precomputed 128x64 bitmap shown twice through
+a 1x2 TileGrid. Moving the TileGrid down 6 px per frame (mod 64) makes
+the pattern wrap around the screen, so an animation frame is a single
+y write and nothing is built per frame.
+
+Splash.step() never blocks: call it from the boot code between hardware
+setup steps and it shows the next frame only when one is due.
+
+A file named FAST_BOOT_FILE on CIRCUITPY skips the splash entirely.
+"""
+
+import os
+
+import displayio
+import terminalio
+from adafruit_display_text import label
+from adafruit_ticks import ticks_ms, ticks_diff
+
+from playfield import GLYPHS
+
+FAST_BOOT_FILE = "fastboot"
+
+WIDTH = 128
+HEIGHT = 64
+
+
+def fast_boot_enabled() -> bool:
+    try:
+        os.stat(FAST_BOOT_FILE)
+        return True
+    except OSError:
+        return False
+
+
+def set_fast_boot(enabled: bool) -> bool:
+    """Persist the fast-boot flag. Returns False if CIRCUITPY is read-only."""
+    try:
+        if enabled:
+            with open(FAST_BOOT_FILE, "w") as f:
+                f.write("1\n")
+        else:
+            os.remove(FAST_BOOT_FILE)
+    except OSError:
+        return False
+    return True
+
+
+def _rain_bitmap():
+    # Frame 0 of the original animation: two planes per lane, 24 px apart
+    bitmap = displayio.Bitmap(WIDTH, HEIGHT, 2)
+    rows = GLYPHS["X"]
+    for col in range(8):
+        x = 4 + col * 16
+        for center in (col * 6, col * 6 + 24):
+            top = center - len(rows) // 2
+            for gy in range(len(rows)):
+                y = (top + gy) % HEIGHT
+                row = rows[gy]
+                for gx in range(len(row)):
+                    if row[gx] == "#":
+                        bitmap[x + gx, y] = 1
+    return bitmap
+
+
+class Splash:
+    def __init__(self, display, frames: int = 14, frame_ms: int = 25, title_ms: int = 400):
+        """
+        frames: rain animation frames
+        frame_ms: time per rain frame
+        title_ms: how long the title stays up
+        """
+        self._display = display
+        self._frames = frames
+        self._frame_ms = frame_ms
+        self._title_ms = title_ms
+
+        palette = displayio.Palette(2)
+        palette[0] = 0x000000
+        palette[1] = 0xFFFFFF
+
+        self._rain = displayio.TileGrid(
+            _rain_bitmap(),
+            pixel_shader=palette,
+            width=1,
+            height=2,
+            tile_width=WIDTH,
+            tile_height=HEIGHT,
+            y=-HEIGHT,
+        )
+        self._rain_group = displayio.Group()
+        self._rain_group.append(self._rain)
+
+        self._title_group = displayio.Group()
+        self._title_group.append(label.Label(terminalio.FONT, text="THUNDER", x=42, y=24))
+        self._title_group.append(label.Label(terminalio.FONT, text="FIGHTER", x=42, y=40))
+
+        self._frame = 0
+        self._last = ticks_ms()
+        self.done = False
+
+        display.root_group = self._rain_group
+
+    def step(self) -> bool:
+        """Advance the animation if a frame is due. Returns True when finished."""
+        if self.done:
+            return True
+
+        now = ticks_ms()
+        if self._frame < self._frames:
+            if ticks_diff(now, self._last) < self._frame_ms:
+                return False
+            self._last = now
+            self._frame += 1
+            if self._frame < self._frames:
+                self._rain.y = (self._frame * 6) % HEIGHT - HEIGHT
+            else:
+                self._display.root_group = self._title_group
+            return False
+
+        if ticks_diff(now, self._last) >= self._title_ms:
+            self.done = True
+        return self.done
+
+    def skip(self) -> None:
+        self.done = True
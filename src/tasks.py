@@ -0,0 +1,113 @@
+"""
+tasks.py
+
+Cooperative runtime for Thunder Fighter's async mode (RUNTIME = "async"
+in code.py).
+
+Each subsystem (input polling, sensor sampling, game update, rendering,
+LED) is a plain function wrapped in a PeriodicTask and run as its own
+asyncio task every period_ms. Due times are kept on a ticks_ms timeline,
+so a task that ran a little late does not drift; one that fell a whole
+period behind skips ahead instead of running in a burst.
+
+Tasks never call each other. They pass data through small shared state
+objects: InputState latches button edges until the game task has seen
+them, TiltState holds the latest tilt reading.
+
+Each task counts its runs in a profiler.CallTimer, which with timing on
+also measures them, and counts how often it started a period late.
+
+The state objects work without asyncio, so the plain loop uses them too.
+Running tasks needs the asyncio library from the CircuitPython bundle
+(lib/asyncio); available() says whether it is installed.
+"""
+
+from adafruit_ticks import ticks_ms, ticks_add, ticks_diff
+
+from profiler import CallTimer
+
+try:
+    import asyncio
+except ImportError:
+    asyncio = None
+
+# CircuitPython's asyncio sleeps in integer ms; wait / 1000 would build a
+# float every period. CPython's (the host harness) only takes seconds.
+if asyncio is not None and hasattr(asyncio, "sleep_ms"):
+    _sleep_ms = asyncio.sleep_ms
+else:
+    async def _sleep_ms(ms: int) -> None:
+        await asyncio.sleep(ms / 1000)
+
+
+def available() -> bool:
+    return asyncio is not None
+
+
+class InputState:
+    """Edges seen by the input task, kept until the game task clears them."""
+
+    def __init__(self):
+        self.confirm = False
+        self.invincible = False
+        self.turned = False
+
+    def clear(self) -> None:
+        self.confirm = False
+        self.invincible = False
+        self.turned = False
+
+
+class TiltState:
+    """Latest filtered tilt from the sensor task, in integer mm/s^2."""
+
+    def __init__(self):
+        self.dx = 0
+        self.dy = 0
+
+
+class PeriodicTask:
+    def __init__(self, name: str, fn, period_ms: int, timing: bool = False):
+        """
+        name: shown in summary()
+        fn: called with no arguments once per period
+        period_ms: time between the starts of two calls
+        timing: measure each run in microseconds, see CallTimer
+        """
+        self.name = name
+        self.fn = fn
+        self.period_ms = max(0, int(period_ms))
+
+        self.timer = CallTimer(timing)
+        self.late = 0
+
+    async def run(self) -> None:
+        due = ticks_ms()
+        while True:
+            start = self.timer.start()
+            self.fn()
+            self.timer.stop(start)
+
+            due = ticks_add(due, self.period_ms)
+            wait = ticks_diff(due, ticks_ms())
+            if wait < 0:
+                # More than a period behind: drop the missed runs
+                if -wait >= self.period_ms:
+                    self.late += 1
+                    due = ticks_ms()
+                wait = 0
+            await _sleep_ms(wait)
+
+    def summary(self) -> str:
+        return "{} every {} ms: {}, late {}".format(self.name, self.period_ms, self.timer.summary(), self.late)
+
+
+async def _gather(tasks) -> None:
+    await asyncio.gather(*[asyncio.create_task(task.run()) for task in tasks])
+
+
+def run(tasks) -> None:
+    """Run the PeriodicTasks forever."""
+    if asyncio is None:
+        raise RuntimeError("asyncio library not installed")
+    asyncio.run(_gather(tasks))
@@ -13,46 +13,104 @@ Thunder Fighter main game logic.
 
 Scoring:
 - Player gets 1 point for each level finished.
-- Max score = 10 (10 levels).
+- Max score = 10 (10 levels), unlimited in endless mode.
+
+Levels are streamed from the compiled pack in levels.py.
+
+The engine runs in integers: positions are in SCALE sub-units per cell,
+enemy speeds in sub-units per ms, tilt in mm/s^2 and all timers in ms.
+CircuitPython boxes most floats on the heap, so update_ms() and
+handle_input_fp() leave no garbage behind. update() and handle_input()
+take the old float seconds / m/s^2 and convert.
 """
 
+from array import array
+
 import displayio
 import terminalio
 from adafruit_display_text import label
 
-SPAWN_INTERVAL = 1.0
+from levels import LevelPack
+from playfield import (
+    Playfield,
+    TILE_EMPTY,
+    TILE_ENEMY,
+    TILE_PLAYER,
+    TILE_INVINCIBLE,
+)
+
 TILT_GAIN_X = 1.5
 TILT_GAIN_Y = 1.5
 IDLE_TIMEOUT = 5.0
+INVINCIBLE_TIME = 2.0
+
+# Sub-units per cell. With 10^6 the difficulty speeds (0.5, 0.9, 1.4
+# rows/s) and their level percentages are whole sub-units per ms, and
+# positions (at most 5 * 10^6) stay CircuitPython small ints.
+SCALE = 1000000
+HALF = SCALE // 2
+
+# Sub-units per mm/s^2 of tilt
+TILT_GAIN_X_FP = int(TILT_GAIN_X * SCALE / 1000 + 0.5)
+TILT_GAIN_Y_FP = int(TILT_GAIN_Y * SCALE / 1000 + 0.5)
+IDLE_TIMEOUT_MS = int(IDLE_TIMEOUT * 1000)
+INVINCIBLE_MS = int(INVINCIBLE_TIME * 1000)
+
+# _next_spawn_ms once a level has spawned everything, the largest
+# CircuitPython small int
+NEVER = (1 << 30) - 1
+
+
+def speed_fp(rows_per_s: float) -> int:
+    """Fall speed in sub-units per ms."""
+    return int(rows_per_s * SCALE / 1000 + 0.5)
+
 
-LEVEL_PATTERNS = [
-    [0, 0, 4, 4, 7, 7],
-    [1, 7, 4, 1, 4, 7, 4],
-    [0, 2, 4, 6, 4, 2, 0],
-    [7, 5, 3, 1, 3, 5, 7],
-    [0, 3, 6, 2, 1, 4, 7, 2],
-    [1, 4, 2, 7, 5, 4, 1],
-    [1, 2, 3, 7, 6, 5, 4, 1, 2, 3],
-    [2, 4, 6, 4, 2, 3, 5, 7, 4],
-    [0, 7, 3, 4, 1, 6, 2, 5, 7, 4, 3],
-    [1, 3, 7, 5, 2, 6, 4, 0, 3, 4, 6, 5, 7, 2],
-]
+def speed_for_difficulty(name: str) -> int:
+    """Base fall speed of a difficulty in sub-units per ms."""
+    if name == "EASY":
+        rows_per_s = 0.5
+    elif name == "MEDIUM":
+        rows_per_s = 0.9
+    elif name == "HARD":
+        rows_per_s = 1.4
+    else:
+        rows_per_s = 0.5
+    return speed_fp(rows_per_s)
 
 
 class ThunderFighterGame:
-    def __init__(self, display, difficulty_name: str):
+    def __init__(self, display, difficulty_name: str, damage=None, levels=None, memory=None):
+        """
+        display: display whose root_group shows the game
+        difficulty_name: "EASY", "MEDIUM" or "HARD"
+        damage: optional RefreshController told about changed areas
+        levels: LevelPack to play, default the 10-level pack
+        memory: optional MemoryManager, level loads are GC safe points
+        """
         self.display = display
+        self._damage = damage
+        self._memory = memory
 
         self.cols = 8
         self.rows = 5
 
-        self.level_patterns = LEVEL_PATTERNS
-        self.max_level = len(self.level_patterns)
+        self.levels = levels if levels is not None else LevelPack()
+        # None in endless mode
+        self.max_level = self.levels.count
         self.current_level = 1
 
-        self.enemy_speed = self._speed_for_difficulty(difficulty_name)
-        self.spawn_interval = SPAWN_INTERVAL
-
+        # Sub-units per ms
+        self.base_speed = speed_for_difficulty(difficulty_name)
+        self.enemy_speed = self.base_speed
+
+        # Spawn timeline: absolute spawn times in ms since level start,
+        # compiled at level load. _next_spawn_ms is the one value update()
+        # compares against each frame.
+        self.spawn_times = array("l", [0] * self.levels.max_spawns)
+        self.level_ms = 0
+        self._next_spawn_ms = 0
+        self._dt_rem_us = 0
         self._load_pattern_for_level(self.current_level)
 
         self.player_x = self.cols // 2
@@ -60,36 +118,111 @@ class ThunderFighterGame:
 
         self.last_move_x = self.player_x
         self.last_move_y = self.player_y
-        self.idle_timer = 0.0
-
-        self.enemies = []
-        self.spawn_timer = 0.0
+        self.idle_ms = 0
+
+        # Enemy pool: parallel fixed-size slots, the first enemy_count live.
+        # A level only advances once every enemy has left the screen, so the
+        # longest level bounds how many enemies can be alive at once.
+        max_enemies = self.levels.max_spawns
+        self.enemy_x = bytearray(max_enemies)
+        self.enemy_y = array("l", [0] * max_enemies)
+        self.enemy_count = 0
+
+        # Occupancy: enemy_cell_y is each enemy's rounded row (rows = off
+        # screen), row_mask has bit x set while any enemy sits in (x, row).
+        # _cell_count lets two enemies share a cell without losing the bit.
+        self.enemy_cell_y = bytearray(max_enemies)
+        self.row_mask = bytearray(self.rows)
+        self._cell_count = bytearray(self.cols * self.rows)
 
         self.invincible = False
-        self.invincible_timer = 0.0
+        self.invincible_ms = 0
 
         self.score = 0
 
-    def _speed_for_difficulty(self, name: str) -> float:
-        if name == "EASY":
-            return 0.5
-        if name == "MEDIUM":
-            return 0.9
-        if name == "HARD":
-            return 1.4
-        return 0.5
+        self._build_scene()
+
+    def _build_scene(self) -> None:
+        # Retained scene: every displayio object is created once here and
+        # draw() only writes tiles / swaps text when something changed.
+        self.group = displayio.Group()
+
+        self._level_label = label.Label(terminalio.FONT, text="LV1", x=0, y=8)
+        self.group.append(self._level_label)
+
+        self._score_label = label.Label(terminalio.FONT, text="Sc0", x=110, y=8)
+        self.group.append(self._score_label)
+
+        self.playfield = Playfield(self.cols, self.rows, damage=self._damage)
+        self.group.append(self.playfield.grid)
+
+        self._countdown_label = label.Label(
+            terminalio.FONT,
+            text=str((IDLE_TIMEOUT_MS + 500) // 1000),
+            x=112,
+            y=60,
+        )
+        self.group.append(self._countdown_label)
+
+        # row_mask as currently shown on the playfield
+        self._drawn_mask = bytearray(self.rows)
+
+        self._invalidate_scene()
+
+    def _invalidate_scene(self) -> None:
+        self._drawn_level = -1
+        self._drawn_score = -1
+        self._drawn_seconds = -1
+        self._drawn_px = -1
+        self._drawn_py = -1
+
+        self.playfield.clear()
+        for row in range(self.rows):
+            self._drawn_mask[row] = 0
+
+    def _occupy(self, x: int, row: int) -> None:
+        if row < self.rows:
+            i = row * self.cols + x
+            if self._cell_count[i] == 0:
+                self.row_mask[row] |= 1 << x
+            self._cell_count[i] += 1
+
+    def _vacate(self, x: int, row: int) -> None:
+        if row < self.rows:
+            i = row * self.cols + x
+            self._cell_count[i] -= 1
+            if self._cell_count[i] == 0:
+                self.row_mask[row] &= ~(1 << x)
+
+    def _clear_enemies(self) -> None:
+        self.enemy_count = 0
+        for row in range(self.rows):
+            self.row_mask[row] = 0
+        for i in range(len(self._cell_count)):
+            self._cell_count[i] = 0
 
     def _load_pattern_for_level(self, level: int) -> None:
-        idx = max(0, min(level - 1, self.max_level - 1))
-        self.current_pattern = self.level_patterns[idx]
-        self.pattern_length = len(self.current_pattern)
+        # Read into the pack's buffer, current_pattern is always that buffer
+        self.pattern_length = self.levels.load(level)
+        self.current_pattern = self.levels.buffer
+        self.enemy_speed = self.base_speed * self.levels.speed // 100
+
+        # Spawn k is due (k + 1) intervals into the level. Each time is
+        # computed from the start rather than by adding up frame times.
+        interval_ms = self.levels.interval_ms
+        for k in range(self.pattern_length):
+            self.spawn_times[k] = (k + 1) * interval_ms
         self.spawn_index = 0
-        self.enemies_spawned_in_level = 0
-        self.spawn_timer = 0.0
+        self.level_ms = 0
+        self._next_spawn_ms = self.spawn_times[0] if self.pattern_length else NEVER
+
+        # The playfield is empty between levels, nothing to see a pause on
+        if self._memory is not None:
+            self._memory.collect()
 
     def reset(self, difficulty_name: str = None) -> None:
         if difficulty_name is not None:
-            self.enemy_speed = self._speed_for_difficulty(difficulty_name)
+            self.base_speed = speed_for_difficulty(difficulty_name)
 
         self.current_level = 1
         self._load_pattern_for_level(self.current_level)
@@ -99,130 +232,185 @@ class ThunderFighterGame:
 
         self.last_move_x = self.player_x
         self.last_move_y = self.player_y
-        self.idle_timer = 0.0
+        self.idle_ms = 0
+        self._dt_rem_us = 0
 
-        self.enemies = []
-        self.spawn_timer = 0.0
+        self._clear_enemies()
         self.invincible = False
-        self.invincible_timer = 0.0
+        self.invincible_ms = 0
 
         self.score = 0
+        self._invalidate_scene()
 
     def handle_input(self, dx, dy, invincible_pressed: bool) -> None:
+        """Float wrapper: dx, dy in m/s^2 (or None), rounded like set_baseline()."""
+        self.handle_input_fp(
+            None if dx is None else int(dx * 1000 + (0.5 if dx >= 0 else -0.5)),
+            None if dy is None else int(dy * 1000 + (0.5 if dy >= 0 else -0.5)),
+            invincible_pressed,
+        )
+
+    def handle_input_fp(self, dx, dy, invincible_pressed: bool) -> None:
+        """dx, dy: tilt in integer mm/s^2, or None for no reading."""
         # X axis
         if dx is not None:
-            cx = (self.cols - 1) / 2.0
-            pos_x = cx + dx * TILT_GAIN_X
-            pos_x = max(0.0, min(self.cols - 1, pos_x))
-            self.player_x = int(pos_x + 0.5)
+            pos_x = (self.cols - 1) * HALF + dx * TILT_GAIN_X_FP
+            if pos_x < 0:
+                pos_x = 0
+            elif pos_x > (self.cols - 1) * SCALE:
+                pos_x = (self.cols - 1) * SCALE
+            self.player_x = (pos_x + HALF) // SCALE
 
         # Y axis
         if dy is not None:
-            cy = (self.rows - 1) / 2.0
-            pos_y = cy - dy * TILT_GAIN_Y
-            pos_y = max(0.0, min(self.rows - 1, pos_y))
-            self.player_y = int(pos_y + 0.5)
+            pos_y = (self.rows - 1) * HALF - dy * TILT_GAIN_Y_FP
+            if pos_y < 0:
+                pos_y = 0
+            elif pos_y > (self.rows - 1) * SCALE:
+                pos_y = (self.rows - 1) * SCALE
+            self.player_y = (pos_y + HALF) // SCALE
 
         if invincible_pressed and not self.invincible:
             self.invincible = True
-            self.invincible_timer = 2.0
+            self.invincible_ms = INVINCIBLE_MS
 
     def update(self, dt: float) -> str:
+        """Float wrapper: dt in seconds, sub-ms remainders carry over."""
+        us = int(dt * 1000000 + 0.5) + self._dt_rem_us
+        self._dt_rem_us = us % 1000
+        return self.update_ms(us // 1000)
+
+    def update_ms(self, dt_ms: int) -> str:
         if self.invincible:
-            self.invincible_timer -= dt
-            if self.invincible_timer <= 0.0:
+            self.invincible_ms -= dt_ms
+            if self.invincible_ms <= 0:
                 self.invincible = False
 
-        if self.enemies_spawned_in_level < self.pattern_length:
-            self.spawn_timer += dt
-            if self.spawn_timer >= self.spawn_interval:
-                self.spawn_timer = 0.0
-                col = self.current_pattern[self.spawn_index]
-                self.spawn_index += 1
-                self.enemies_spawned_in_level += 1
-                self.enemies.append({"x": float(col), "y": 0.0})
-        else:
-            if not self.enemies:
-                if self.current_level >= self.max_level:
-                    self.score = self.max_level
-                    return "win"
-                else:
-                    self.score = self.current_level
-                    self.current_level += 1
-                    self._load_pattern_for_level(self.current_level)
-
-        new_enemies = []
-        for e in self.enemies:
-            e["y"] += self.enemy_speed * dt
-            if e["y"] < self.rows:
-                new_enemies.append(e)
-        self.enemies = new_enemies
+        # Move enemies, swap-removing the ones that left the screen and
+        # touching the occupancy masks only when an enemy changes cell
+        enemy_x = self.enemy_x
+        enemy_y = self.enemy_y
+        cell_y = self.enemy_cell_y
+        step = self.enemy_speed * dt_ms
+        bottom = self.rows * SCALE
+        n = self.enemy_count
+        i = 0
+        while i < n:
+            y = enemy_y[i] + step
+            if y < bottom:
+                enemy_y[i] = y
+                row = (y + HALF) // SCALE
+                if row != cell_y[i]:
+                    self._vacate(enemy_x[i], cell_y[i])
+                    self._occupy(enemy_x[i], row)
+                    cell_y[i] = row
+                i += 1
+            else:
+                self._vacate(enemy_x[i], cell_y[i])
+                n -= 1
+                enemy_x[i] = enemy_x[n]
+                enemy_y[i] = enemy_y[n]
+                cell_y[i] = cell_y[n]
+        self.enemy_count = n
+
+        self.level_ms += dt_ms
+        if self.level_ms >= self._next_spawn_ms:
+            self._spawn_due()
+        elif self.spawn_index >= self.pattern_length and self.enemy_count == 0:
+            if self.max_level is not None and self.current_level >= self.max_level:
+                self.score = self.max_level
+                return "win"
+            self.score = self.current_level
+            self.current_level += 1
+            self._load_pattern_for_level(self.current_level)
 
         if self.player_x == self.last_move_x and self.player_y == self.last_move_y:
-            self.idle_timer += dt
+            self.idle_ms += dt_ms
         else:
-            self.idle_timer = 0.0
+            self.idle_ms = 0
             self.last_move_x = self.player_x
             self.last_move_y = self.player_y
 
-        if self.idle_timer >= IDLE_TIMEOUT:
+        if self.idle_ms >= IDLE_TIMEOUT_MS:
             return "game_over"
 
-        if not self.invincible:
-            for e in self.enemies:
-                ex = int(e["x"] + 0.5)
-                ey = int(e["y"] + 0.5)
-                if ex == self.player_x and ey == self.player_y:
-                    return "game_over"
+        if not self.invincible and self.row_mask[self.player_y] & (1 << self.player_x):
+            return "game_over"
 
         return "running"
 
-    def draw(self) -> None:
-        group = displayio.Group()
-        level_label = label.Label(
-            terminalio.FONT,
-            text="LV" + str(self.current_level),
-            x=0,
-            y=8,
-        )
-        group.append(level_label)
-
-        score_label = label.Label(
-            terminalio.FONT,
-            text="Sc" + str(self.score),
-            x=110,
-            y=8,
-        )
-        group.append(score_label)
-
-        # Player
-        ch = "+" if not self.invincible else "*"
-        px = 4 + self.player_x * 16
-        py = 10 + self.player_y * 11
-        player_label = label.Label(terminalio.FONT, text=ch, x=px, y=py)
-        group.append(player_label)
-
-        # Enemies
-        for e in self.enemies:
-            ex = 4 + int(e["x"] + 0.5) * 16
-            ey = 10 + int(e["y"] + 0.5) * 11
-            enemy_label = label.Label(terminalio.FONT, text="X", x=ex, y=ey)
-            group.append(enemy_label)
-
-        if self.idle_timer <= 0.0:
-            remaining = IDLE_TIMEOUT
-        else:
-            remaining = IDLE_TIMEOUT - self.idle_timer
-            if remaining < 0:
-                remaining = 0
-
-        seconds = int(remaining + 0.5)
-        countdown_label = label.Label(
-            terminalio.FONT,
-            text=str(seconds),
-            x=112,
-            y=60,
-        )
-        group.append(countdown_label)
+    def _spawn_due(self) -> None:
+        # Emit every spawn whose time has passed, already moved as far as
+        # it would have fallen since its exact spawn time
+        times = self.spawn_times
+        now = self.level_ms
+        k = self.spawn_index
+        while k < self.pattern_length and times[k] <= now:
+            y = self.enemy_speed * (now - times[k])
+            if y < self.rows * SCALE:
+                col = self.current_pattern[k]
+                row = (y + HALF) // SCALE
+                n = self.enemy_count
+                self.enemy_x[n] = col
+                self.enemy_y[n] = y
+                self.enemy_cell_y[n] = row
+                self.enemy_count = n + 1
+                self._occupy(col, row)
+            k += 1
+        self.spawn_index = k
+        self._next_spawn_ms = times[k] if k < self.pattern_length else NEVER
+
+    def _set_text(self, text_label, text: str) -> None:
+        old_len = len(text_label.text)
+        text_label.text = text
+        if self._damage is not None:
+            self._damage.mark_label(text_label, old_len)
 
-        self.display.root_group = group
\ No newline at end of file
+    def draw(self) -> None:
+        if self.current_level != self._drawn_level:
+            self._set_text(self._level_label, "LV" + str(self.current_level))
+            self._drawn_level = self.current_level
+
+        if self.score != self._drawn_score:
+            self._set_text(self._score_label, "Sc" + str(self.score))
+            self._drawn_score = self.score
+
+        # Playfield: diff the occupancy masks against what is on screen,
+        # leaving the player's cell to the player sprite
+        playfield = self.playfield
+        drawn = self._drawn_mask
+        px = self.player_x
+        py = self.player_y
+        for row in range(self.rows):
+            mask = self.row_mask[row]
+            changed = mask ^ drawn[row]
+            if changed:
+                drawn[row] = mask
+                for col in range(self.cols):
+                    if changed & (1 << col) and (col != px or row != py):
+                        tile = TILE_ENEMY if mask & (1 << col) else TILE_EMPTY
+                        playfield.set_cell(col, row, tile)
+
+        if px != self._drawn_px or py != self._drawn_py:
+            if self._drawn_px >= 0:
+                ox = self._drawn_px
+                oy = self._drawn_py
+                tile = TILE_ENEMY if drawn[oy] & (1 << ox) else TILE_EMPTY
+                playfield.set_cell(ox, oy, tile)
+            self._drawn_px = px
+            self._drawn_py = py
+
+        tile = TILE_PLAYER if not self.invincible else TILE_INVINCIBLE
+        playfield.set_cell(px, py, tile)
+
+        remaining = IDLE_TIMEOUT_MS - self.idle_ms
+        if remaining < 0:
+            remaining = 0
+
+        seconds = (remaining + 500) // 1000
+        if seconds != self._drawn_seconds:
+            self._set_text(self._countdown_label, str(seconds))
+            self._drawn_seconds = seconds
+
+        if self.display.root_group is not self.group:
+            self.display.root_group = self.group